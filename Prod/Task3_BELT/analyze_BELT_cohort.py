@@ -0,0 +1,51 @@
+import os
+import sys
+import glob
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from nctlab.belt import run_belt_cohort
+from nctlab.cli import add_output_arguments, add_log_cache_arguments, add_block_arguments, add_bootstrap_arguments, add_instrument_arguments, \
+                       check_block_arguments, get_log_cache_max_bytes, get_bootstrap_options, get_instrument_options
+from nctlab.instrument import instrument_run
+
+def main():
+    '''
+    Parse Arguments
+    '''
+    parser = argparse.ArgumentParser(description='Analyze BELT of a whole cohort into a single subject-by-metric table')
+    parser.add_argument('-data_path', type=str, required=True,
+                       help='a path to the data directory or a glob pattern of the CSV files (e.g., "./data/*_BELT_TEST_*.csv")')
+    add_output_arguments(parser)
+    add_log_cache_arguments(parser)
+    add_block_arguments(parser)
+    add_instrument_arguments(parser)
+    add_bootstrap_arguments(parser, 'the cohort mean of every stat')
+    args = parser.parse_args()
+    check_block_arguments(parser, args)
+    bootstrap = get_bootstrap_options(args, parser)
+
+    data_path = os.path.expanduser(args.data_path)
+    if os.path.isdir(data_path):
+        data_path = os.path.join(data_path, '*_BELT_TEST_*.csv')
+    # Every CSV file is paired with the log file of the same name
+    session_paths = []
+    for csv_path in sorted(glob.glob(data_path)):
+        log_path = os.path.splitext(csv_path)[0] + '.log'
+        if not os.path.isfile(log_path):
+            print("[WARN] Skipping {}: the corresponding log file {} is not found.".format(csv_path, log_path))
+            continue
+        session_paths.append((csv_path, log_path))
+    if len(session_paths) == 0:
+        print("[WARN] No BELT sessions are found in {}".format(args.data_path))
+        sys.exit(1)
+
+    # The whole cohort is recorded as a single session named cohort
+    with instrument_run('belt', 'cohort', get_instrument_options(args)):
+        run_belt_cohort(session_paths, args.out_dir, args.output_backend, args.log_cache_dir, get_log_cache_max_bytes(args), args.num_blocks, args.block_size,
+                        bootstrap)
+    print("[INFO] Completed {} sessions.".format(len(session_paths)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,455 @@
+import io
+import os
+import sys
+import glob
+import time
+import asyncio
+import argparse
+import traceback
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from nctlab import run_nback, run_facematching, run_belt, run_banda, run_banda_facematching
+from nctlab import analyze_nback, analyze_facematching, analyze_belt, analyze_banda, analyze_banda_facematching
+from nctlab.nback import load_nback_ref, read_nback, save_nback
+from nctlab.facematching import load_facematching_ref, read_facematching, save_facematching
+from nctlab.belt import BELT_Analyzer, save_belt
+from nctlab.banda import read_banda, save_banda
+from nctlab.banda_facematching import read_banda_facematching, save_banda_facematching
+from nctlab.cli import add_output_arguments, add_log_cache_arguments, add_bootstrap_arguments, add_instrument_arguments, get_log_cache_max_bytes, \
+                       get_bootstrap_options, get_instrument_options
+from nctlab.output import get_session_ids
+from nctlab.manifest import Manifest, MANIFEST_FILENAME, get_analyzer_version, is_modified_since
+from nctlab.instrument import enable_instrumentation, disable_instrumentation, is_instrumentation_enabled, instrument_session, instrument_stage, \
+                              summarize_instrumentation
+from nctlab import nback, facematching, belt, banda, banda_facematching
+
+ANALYZER_VERSIONS = {'nback'             : get_analyzer_version(nback),
+                     'facematching'      : get_analyzer_version(facematching),
+                     'belt'              : get_analyzer_version(belt),
+                     'banda'             : get_analyzer_version(banda),
+                     'banda_facematching': get_analyzer_version(banda_facematching)}
+
+'''
+detectTask:
+    Detect the task of a CSV file from its filename.
+    Return None if the file is not a session of any task (e.g., reference CSV files).
+    e.g.) AA06LC00_Nback_2021_Jun_09_1034.csv                 -> nback
+          AA06LC00_FaceMatching_2021_Jun_09_1112.csv          -> facematching
+          AA06LC00_BELT_TEST_2021_Jun_09_1320.csv             -> belt
+          BANDA014_Scanner_ABCD_conflict_2017_Jan_22_1515.csv -> banda
+          BANDA014_Scanner_AB_FaceMatching_2017_Jan_22_1503.csv -> banda_facematching
+'''
+def detectTask(csv_path):
+    filename = os.path.basename(csv_path)
+    if '_Nback_' in filename:
+        return 'nback'
+    if '_FaceMatching_' in filename:
+        # Face-matching of BANDA is recorded on the scanner and does not require the reference CSV
+        return 'banda_facematching' if '_Scanner_' in filename else 'facematching'
+    if '_BELT_TEST_' in filename:
+        return 'belt'
+    if '_conflict_' in filename:
+        return 'banda'
+    return None
+
+'''
+findSessions:
+    Get a data directory or a glob pattern.
+    Return a list of sessions (task, csv_path, log_path). BELT CSV files are paired with the .log file of the same name.
+'''
+def findSessions(data_path):
+    if os.path.isdir(data_path):
+        csv_paths = glob.glob(os.path.join(data_path, '*.csv'))
+    else:
+        csv_paths = [path for path in glob.glob(os.path.expanduser(data_path)) if path.endswith('.csv')]
+    sessions = []
+    for csv_path in sorted(csv_paths):
+        task = detectTask(csv_path)
+        if task is None:
+            continue
+        log_path = None
+        if task == 'belt':
+            log_path = os.path.splitext(csv_path)[0] + '.log'
+            if not os.path.isfile(log_path):
+                print("[WARN] Skipping {}: the corresponding log file {} is not found.".format(csv_path, log_path))
+                continue
+        sessions.append((task, csv_path, log_path))
+    return sessions
+
+'''
+getInputPaths:
+    Return a list of every input file of a session (main CSV, reference CSV or BELT .log).
+'''
+def getInputPaths(task, csv_path, log_path, ref_paths):
+    input_paths = [csv_path, log_path, ref_paths.get(task)]
+    return [path for path in input_paths if path is not None]
+
+'''
+checkReferencePaths:
+    Check that every given reference CSV file exists, and that every task of the sessions that requires one
+    (N-back and Face-matching) has one. Raise ValueError otherwise, so that a missing reference is reported once
+    instead of failing every session of the task in the workers.
+'''
+def checkReferencePaths(sessions, ref_paths):
+    for task, ref_path in ref_paths.items():
+        if ref_path is not None and not os.path.isfile(ref_path):
+            raise ValueError("-{}_ref_path: {} is not found".format(task, ref_path))
+    for task in sorted({task for task, _, _ in sessions if task in ('nback', 'facematching')}):
+        if ref_paths.get(task) is None:
+            raise ValueError("A reference CSV file is required for {} (-{}_ref_path)".format(task, task))
+
+'''
+runTask:
+    Run the analysis of a single session, writing its output into out_dir with the given output backend.
+    `log_cache_options` (keyword arguments of nctlab.belt.run_belt, i.e., log_cache_dir and log_cache_max_bytes) enables the cache of BELT logs.
+    `bootstrap` options (see nctlab.bootstrap) add the bootstrap intervals of the averages.
+    Return a list of the saved paths.
+'''
+def runTask(task, csv_path, log_path, ref_paths, out_dir, backend='csv', log_cache_options=None, bootstrap=None):
+    if task in ('nback', 'facematching') and ref_paths.get(task) is None:
+        raise ValueError("A reference CSV file is required for {} (-{}_ref_path)".format(task, task))
+    if task == 'nback':
+        return run_nback(csv_path, ref_paths['nback'], out_dir, backend, bootstrap)
+    if task == 'facematching':
+        return run_facematching(csv_path, ref_paths['facematching'], out_dir, backend, bootstrap)
+    if task == 'belt':
+        return run_belt(csv_path, log_path, out_dir, backend=backend, bootstrap=bootstrap, **(log_cache_options or {}))
+    if task == 'banda':
+        return run_banda(csv_path, out_dir, backend, bootstrap=bootstrap)
+    return run_banda_facematching(csv_path, out_dir, backend, bootstrap=bootstrap)
+
+'''
+runSession:
+    Run a single session in the current (worker) process.
+    pandas is imported once per worker and reused across sessions.
+    If `instrument_options` (keyword arguments of nctlab.instrument.enable_instrumentation) is given,
+    the stages of the session are recorded.
+    Return (csv_path, a list of the saved paths, error message or None).
+'''
+def runSession(task, csv_path, log_path, ref_paths, out_dir, backend='csv', instrument_options=None, log_cache_options=None, bootstrap=None):
+    if instrument_options is not None and not is_instrumentation_enabled():
+        enable_instrumentation(**instrument_options)
+    try:
+        with instrument_session(task, os.path.splitext(os.path.basename(csv_path))[0]):
+            save_paths = runTask(task, csv_path, log_path, ref_paths, out_dir, backend, log_cache_options, bootstrap)
+    except Exception:
+        return csv_path, [], traceback.format_exc()
+    return csv_path, save_paths, None
+
+'''
+runBatch:
+    Analyze every session over a process pool.
+    on_complete(csv_path, save_paths) is called in this process for every successful session.
+    Raise ValueError before starting the workers if a reference CSV file is missing (see checkReferencePaths).
+    Return a list of (csv_path, error message) of the failed sessions.
+'''
+def runBatch(sessions, ref_paths, out_dir, num_workers=None, backend='csv', on_complete=None, instrument_options=None, log_cache_options=None,
+             bootstrap=None):
+    checkReferencePaths(sessions, ref_paths)
+    failures = []
+    with ProcessPoolExecutor(max_workers=num_workers) as executor:
+        futures = [executor.submit(runSession, task, csv_path, log_path, ref_paths, out_dir, backend, instrument_options, log_cache_options, bootstrap)
+                   for task, csv_path, log_path in sessions]
+        for future in as_completed(futures):
+            csv_path, save_paths, error = future.result()
+            if error is not None:
+                print("[ERROR] Failed to process {}:\n{}".format(csv_path, error))
+                failures.append((csv_path, error))
+            elif on_complete is not None:
+                on_complete(csv_path, save_paths)
+    return failures
+
+'''
+prefetchSession:
+    Read the input files of a session (main CSV and BELT .log) into memory.
+    The .log file is left to the worker if the log cache is enabled, as it is not parsed again on a cache hit.
+    Return a dictionary of the bytes of every file keyed by its path.
+'''
+def prefetchSession(task, csv_path, log_path, log_cache_options=None):
+    input_paths = [csv_path]
+    if log_path is not None and (log_cache_options is None or log_cache_options.get('log_cache_dir') is None):
+        input_paths.append(log_path)
+    sources = {}
+    for path in input_paths:
+        with open(path, mode='rb') as f:
+            sources[path] = f.read()
+    return sources
+
+'''
+analyzeTask:
+    Same as runTask, but parse the prefetched input files (see prefetchSession) instead of reading them, and return
+    the output dataframes instead of saving them (see writeTask).
+'''
+def analyzeTask(task, csv_path, log_path, sources, ref_paths, log_cache_options=None, bootstrap=None):
+    if task in ('nback', 'facematching') and ref_paths.get(task) is None:
+        raise ValueError("A reference CSV file is required for {} (-{}_ref_path)".format(task, task))
+    with instrument_stage(task, 'load') as record:
+        if task == 'nback':
+            data_ref = load_nback_ref(ref_paths['nback'])
+            data = (read_nback(io.BytesIO(sources[csv_path]), data_ref), data_ref)
+        elif task == 'facematching':
+            data_ref = load_facematching_ref(ref_paths['facematching'])
+            data = (read_facematching(io.BytesIO(sources[csv_path]), data_ref), data_ref)
+        elif task == 'belt':
+            if log_path in sources:
+                data_log = BELT_Analyzer.parseLogEvents(io.BytesIO(sources[log_path]))
+            else:
+                data_log = BELT_Analyzer.readLogCached(log_path, log_cache_options['log_cache_dir'], log_cache_options.get('log_cache_max_bytes'))
+            data = (pd.read_csv(io.BytesIO(sources[csv_path])), data_log)
+        elif task == 'banda':
+            data = (read_banda(io.BytesIO(sources[csv_path])),)
+        else:
+            data = (read_banda_facematching(io.BytesIO(sources[csv_path])),)
+        record['rows'] = len(data[0])
+    if task == 'nback':
+        return analyze_nback(*data, bootstrap=bootstrap)
+    if task == 'facematching':
+        return analyze_facematching(*data, bootstrap=bootstrap)
+    if task == 'belt':
+        return analyze_belt(*data, bootstrap=bootstrap)
+    with instrument_stage(task, 'aggregate') as record:
+        record['rows'] = len(data[0])
+        if task == 'banda':
+            return analyze_banda(*data, bootstrap=bootstrap)
+        return analyze_banda_facematching(*data, bootstrap=bootstrap)
+
+'''
+analyzeSession:
+    Run analyzeTask for a single session in the current (worker) process.
+    Return (the output dataframes or None, error message or None).
+'''
+def analyzeSession(task, csv_path, log_path, sources, ref_paths, instrument_options=None, log_cache_options=None, bootstrap=None):
+    if instrument_options is not None and not is_instrumentation_enabled():
+        enable_instrumentation(**instrument_options)
+    try:
+        with instrument_session(task, os.path.splitext(os.path.basename(csv_path))[0]):
+            return analyzeTask(task, csv_path, log_path, sources, ref_paths, log_cache_options, bootstrap), None
+    except Exception:
+        return None, traceback.format_exc()
+
+'''
+writeTask:
+    Save the output dataframes of a session (see analyzeTask) into out_dir with the given output backend.
+    Return a list of the saved paths.
+'''
+def writeTask(task, csv_path, results, out_dir, backend='csv'):
+    subject_id, session_id = get_session_ids(csv_path)
+    if task == 'nback':
+        return save_nback(results, subject_id, out_dir, backend, session_id)
+    if task == 'facematching':
+        return save_facematching(results, subject_id, out_dir, backend, session_id)
+    if task == 'belt':
+        return save_belt(results, subject_id, out_dir, backend, session_id)
+    if task == 'banda':
+        return save_banda(results, csv_path, out_dir, backend)
+    return save_banda_facematching(results, csv_path, out_dir, backend)
+
+'''
+runPipeline:
+    Same as runBatch, but overlap the reads, the analyses and the writes of different sessions, so that the
+    throughput is bound by the CPU rather than the latency of the file system (e.g., network-mounted storage).
+    1. `num_prefetch` threads read the input files of the next sessions into memory (see prefetchSession)
+    2. `num_workers` processes parse and analyze the prefetched sessions (see analyzeSession)
+    3. `num_writers` threads save the outputs (see writeTask)
+    The stages are connected with queues of at most `queue_size` sessions, so a stage waits (backpressure) instead of
+    holding more sessions in memory when the next stage is behind.
+    Raise ValueError before starting the stages if a reference CSV file is missing (see checkReferencePaths).
+    Return a list of (csv_path, error message) of the failed sessions.
+'''
+def runPipeline(sessions, ref_paths, out_dir, num_workers=None, backend='csv', on_complete=None, instrument_options=None,
+                log_cache_options=None, num_prefetch=4, num_writers=2, queue_size=4, bootstrap=None):
+    checkReferencePaths(sessions, ref_paths)
+    num_workers = num_workers or os.cpu_count() or 1
+    if instrument_options is not None:
+        # The prefetch and write stages are recorded by this process (without tracing the memory of the threads),
+        # and the workers enable the instrumentation with the given options on their own (see analyzeSession)
+        enable_instrumentation(**dict(instrument_options, trace_memory=False, profile_dir=None))
+    try:
+        return asyncio.run(runPipelineAsync(sessions, ref_paths, out_dir, num_workers, backend, on_complete, instrument_options,
+                                            log_cache_options, num_prefetch, num_writers, queue_size, bootstrap))
+    finally:
+        disable_instrumentation()
+
+async def runPipelineAsync(sessions, ref_paths, out_dir, num_workers, backend, on_complete, instrument_options,
+                           log_cache_options, num_prefetch, num_writers, queue_size, bootstrap=None):
+    loop = asyncio.get_running_loop()
+    session_iter = iter(sessions)
+    analyze_queue = asyncio.Queue(maxsize=queue_size)
+    write_queue   = asyncio.Queue(maxsize=queue_size)
+    failures = []
+
+    def instrumentStage(task, stage, csv_path, function, *args):
+        with instrument_stage(task, stage) as record:
+            record['session'] = os.path.splitext(os.path.basename(csv_path))[0]
+            return function(*args)
+
+    async def prefetch(executor):
+        for task, csv_path, log_path in session_iter:
+            try:
+                sources = await loop.run_in_executor(executor, instrumentStage, task, 'prefetch', csv_path,
+                                                     prefetchSession, task, csv_path, log_path, log_cache_options)
+            except Exception:
+                error = traceback.format_exc()
+                print("[ERROR] Failed to read {}:\n{}".format(csv_path, error))
+                failures.append((csv_path, error))
+                continue
+            await analyze_queue.put((task, csv_path, log_path, sources))
+
+    async def analyze(executor):
+        while True:
+            session = await analyze_queue.get()
+            if session is None:
+                break
+            task, csv_path, log_path, sources = session
+            print("[INFO] Processing {}...".format(csv_path))
+            results, error = await loop.run_in_executor(executor, analyzeSession, task, csv_path, log_path, sources, ref_paths,
+                                                        instrument_options, log_cache_options, bootstrap)
+            if error is not None:
+                print("[ERROR] Failed to process {}:\n{}".format(csv_path, error))
+                failures.append((csv_path, error))
+                continue
+            await write_queue.put((task, csv_path, results))
+
+    async def write(executor):
+        while True:
+            session = await write_queue.get()
+            if session is None:
+                break
+            task, csv_path, results = session
+            try:
+                save_paths = await loop.run_in_executor(executor, instrumentStage, task, 'write', csv_path,
+                                                        writeTask, task, csv_path, results, out_dir, backend)
+            except Exception:
+                error = traceback.format_exc()
+                print("[ERROR] Failed to write {}:\n{}".format(csv_path, error))
+                failures.append((csv_path, error))
+                continue
+            if on_complete is not None:
+                on_complete(csv_path, save_paths)
+
+    async def runStage(workers, next_queue, num_next):
+        await asyncio.gather(*workers)
+        # Stop the workers of the next stage
+        if next_queue is not None:
+            for _ in range(num_next):
+                await next_queue.put(None)
+
+    with ThreadPoolExecutor(max_workers=num_prefetch) as prefetch_executor, \
+         ProcessPoolExecutor(max_workers=num_workers, initializer=disable_instrumentation) as analyze_executor, \
+         ThreadPoolExecutor(max_workers=num_writers) as write_executor:
+        await asyncio.gather(runStage([prefetch(prefetch_executor) for _ in range(num_prefetch)], analyze_queue, num_workers),
+                             runStage([analyze(analyze_executor) for _ in range(num_workers)], write_queue, num_writers),
+                             runStage([write(write_executor) for _ in range(num_writers)], None, 0))
+    return failures
+
+
+def main():
+    '''
+    Parse Arguments
+    '''
+    parser = argparse.ArgumentParser(description='Analyze every session in a data directory')
+    parser.add_argument('-data_path', type=str, required=True,
+                       help='a path to the data directory or a glob pattern (e.g., "./data/*_Nback_*.csv")')
+    parser.add_argument('-nback_ref_path', type=str, default=None,
+                       help='a path to the reference CSV file of N-back (e.g., nback_AB.csv)')
+    parser.add_argument('-facematching_ref_path', type=str, default=None,
+                       help='a path to the reference CSV file of Face-matching (e.g., facematching_AB.csv)')
+    add_output_arguments(parser)
+    parser.add_argument('-num_workers', type=int, default=None,
+                       help='the number of worker processes (default: the number of CPUs)')
+    parser.add_argument('-force', action='store_true',
+                       help='re-analyze every session, even if its inputs and analyzer version are unchanged')
+    parser.add_argument('-since', type=str, default=None,
+                       help='re-analyze sessions whose input files were modified since this date (e.g., 2021-06-09 or "2021-06-09 13:20")')
+    add_instrument_arguments(parser)
+    add_log_cache_arguments(parser)
+    parser.add_argument('-pipeline', action='store_true',
+                       help='overlap reading, analyzing and writing of different sessions (e.g., for network-mounted storage)')
+    parser.add_argument('-prefetch_workers', type=int, default=4,
+                       help='the number of threads reading the input files ahead when -pipeline is set (default: 4)')
+    parser.add_argument('-write_workers', type=int, default=2,
+                       help='the number of threads writing the outputs when -pipeline is set (default: 2)')
+    parser.add_argument('-queue_size', type=int, default=4,
+                       help='the maximum number of sessions waiting between two stages when -pipeline is set (default: 4)')
+    add_bootstrap_arguments(parser)
+    args = parser.parse_args()
+    bootstrap = get_bootstrap_options(args, parser)
+
+    ref_paths = {'nback'       : os.path.abspath(args.nback_ref_path) if args.nback_ref_path else None,
+                 'facematching': os.path.abspath(args.facematching_ref_path) if args.facematching_ref_path else None}
+    sessions = [(task, os.path.abspath(csv_path), log_path and os.path.abspath(log_path))
+                for task, csv_path, log_path in findSessions(args.data_path)]
+    try:
+        checkReferencePaths(sessions, ref_paths)
+    except ValueError as e:
+        parser.error(str(e))
+    print("[INFO] Found {} sessions in {}".format(len(sessions), args.data_path))
+    out_dir = os.path.abspath(args.out_dir)
+    os.makedirs(out_dir, exist_ok=True)
+
+    # Preprocess the reference CSV files once, so that every worker loads the cached sidecar
+    if ref_paths['nback'] is not None:
+        load_nback_ref(ref_paths['nback'])
+    if ref_paths['facematching'] is not None:
+        load_facematching_ref(ref_paths['facematching'])
+
+    since = None
+    if args.since is not None:
+        since = time.mktime(time.strptime(args.since, '%Y-%m-%d %H:%M' if ':' in args.since else '%Y-%m-%d'))
+
+    # Skip the sessions whose inputs, analyzer version and config are unchanged since the last run
+    manifest = Manifest(os.path.join(out_dir, MANIFEST_FILENAME))
+    config   = {'output_backend': args.output_backend}
+    if bootstrap is not None:
+        # The intervals do not depend on the chunk size
+        config['bootstrap'] = {key: value for key, value in bootstrap.items() if key != 'chunk_size'}
+    session_inputs  = {}
+    sessions_to_run = []
+    for task, csv_path, log_path in sessions:
+        input_paths  = getInputPaths(task, csv_path, log_path, ref_paths)
+        input_hashes = manifest.hash_inputs(input_paths)
+        session_inputs[csv_path] = (input_hashes, ANALYZER_VERSIONS[task])
+        if (not args.force and
+            not (since is not None and is_modified_since(input_paths, since)) and
+            manifest.is_up_to_date(csv_path, input_hashes, ANALYZER_VERSIONS[task], config)):
+            continue
+        sessions_to_run.append((task, csv_path, log_path))
+    print("[INFO] Skipping {} unchanged sessions.".format(len(sessions)-len(sessions_to_run)))
+
+    def recordSession(csv_path, save_paths):
+        input_hashes, analyzer_version = session_inputs[csv_path]
+        manifest.record(csv_path, input_hashes, analyzer_version, save_paths, config)
+
+    instrument_options = get_instrument_options(args)
+
+    log_cache_options = None
+    if args.log_cache_dir is not None:
+        log_cache_options = {'log_cache_dir'      : os.path.abspath(args.log_cache_dir),
+                             'log_cache_max_bytes': get_log_cache_max_bytes(args)}
+
+    try:
+        if args.pipeline:
+            failures = runPipeline(sessions_to_run, ref_paths, out_dir, args.num_workers, args.output_backend, recordSession, instrument_options,
+                                   log_cache_options, args.prefetch_workers, args.write_workers, args.queue_size, bootstrap)
+        else:
+            failures = runBatch(sessions_to_run, ref_paths, out_dir, args.num_workers, args.output_backend, recordSession, instrument_options, log_cache_options,
+                                bootstrap)
+    finally:
+        manifest.save()
+    print("[INFO] Completed {}/{} sessions.".format(len(sessions_to_run)-len(failures), len(sessions_to_run)))
+
+    # Percentiles of every stage per task over the sessions of this run
+    if instrument_options is not None and len(sessions_to_run) > 0:
+        summary = summarize_instrumentation(instrument_options['log_path'], instrument_options['run_id'])
+        summary_path = os.path.splitext(instrument_options['log_path'])[0] + '_summary.csv'
+        summary.to_csv(summary_path, index=False)
+        print(summary[['task', 'stage', 'count', 'wall_seconds_p50', 'wall_seconds_p90', 'wall_seconds_p99', 'wall_seconds_max']].to_string(index=False))
+        print("[INFO] Summary of the stages is saved at {}".format(summary_path))
+    if len(failures) > 0:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
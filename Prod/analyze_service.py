@@ -0,0 +1,286 @@
+import os
+import sys
+import json
+import time
+import signal
+import argparse
+import threading
+import collections
+import socketserver
+import numpy as np
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from analyze_batch import detectTask, runSession
+from nctlab.nback import load_nback_ref
+from nctlab.facematching import load_facematching_ref
+from nctlab.output import OUTPUT_BACKENDS
+from nctlab.cli import add_log_cache_arguments, get_log_cache_max_bytes
+
+'''
+preloadWorker:
+    Initialize a worker process of the service: pandas is already imported, and the reference tables are read
+    once here so that the first job of each worker does not pay for them.
+'''
+def preloadWorker(ref_paths):
+    if ref_paths.get('nback') is not None:
+        load_nback_ref(ref_paths['nback'])
+    if ref_paths.get('facematching') is not None:
+        load_facematching_ref(ref_paths['facematching'])
+
+'''
+Class AnalysisService:
+    Run the jobs of the service on a pool of warm worker processes, and keep the counters of the jobs,
+    i.e., the number of queued, running, completed and failed jobs, and the latencies of the recent jobs.
+'''
+class AnalysisService:
+    def __init__(self, ref_paths, num_workers=None, backend='csv', log_cache_options=None, num_latencies=1000, out_root='.'):
+        self.ref_paths = ref_paths
+        # Outputs are only saved into existing directories under out_root
+        self.out_root  = os.path.realpath(out_root)
+        self.backend   = backend
+        self.log_cache_options = log_cache_options
+        self.num_workers = num_workers or os.cpu_count() or 1
+        self.executor  = ProcessPoolExecutor(max_workers=self.num_workers, initializer=preloadWorker, initargs=(ref_paths,))
+        self.slots     = threading.Semaphore(self.num_workers)
+        self.lock      = threading.Lock()
+        self.started_at = time.time()
+        self.counters  = {'submitted': 0, 'queued': 0, 'running': 0, 'completed': 0, 'failed': 0}
+        # Seconds from the submission to the end of the recent jobs
+        self.latencies = collections.deque(maxlen=num_latencies)
+
+    '''
+    getJob:
+        Validate a job request, i.e., a dictionary with csv_path and optionally task, log_path, out_dir, output_backend
+        and ref_path (for N-back and Face-matching). The task is detected from the filename if not given.
+        out_dir must be an existing directory under the out_root of the service (relative paths are resolved from it,
+        and out_root itself is used if not given), since the service never creates a directory a client asks for.
+        Return (task, csv_path, log_path, ref_paths, out_dir, backend), or raise ValueError.
+    '''
+    def getJob(self, request):
+        if not isinstance(request, dict) or 'csv_path' not in request:
+            raise ValueError("A job must have csv_path (and optionally task, log_path, out_dir, output_backend and ref_path)")
+        csv_path = request['csv_path']
+        task = request.get('task') or detectTask(csv_path)
+        if task not in ('nback', 'facematching', 'belt', 'banda', 'banda_facematching'):
+            raise ValueError("Unknown task of {}: {}".format(csv_path, task))
+        log_path = request.get('log_path')
+        if task == 'belt' and log_path is None:
+            log_path = os.path.splitext(csv_path)[0] + '.log'
+        ref_paths = dict(self.ref_paths)
+        if request.get('ref_path') is not None:
+            ref_paths[task] = request['ref_path']
+        backend = request.get('output_backend', self.backend)
+        if backend not in OUTPUT_BACKENDS:
+            raise ValueError("Unknown output backend: {} (choose from {})".format(backend, ', '.join(OUTPUT_BACKENDS)))
+        for path in [csv_path, log_path, ref_paths.get(task)]:
+            if path is not None and not os.path.isfile(path):
+                raise ValueError("{} is not found".format(path))
+        if task in ('nback', 'facematching') and ref_paths.get(task) is None:
+            raise ValueError("A reference CSV file is required for {} (ref_path, or -{}_ref_path of the service)".format(task, task))
+        out_dir = os.path.realpath(os.path.join(self.out_root, request.get('out_dir', '.')))
+        if os.path.commonpath([self.out_root, out_dir]) != self.out_root:
+            raise ValueError("out_dir must be under {}".format(self.out_root))
+        if not os.path.isdir(out_dir):
+            raise ValueError("{} is not an existing directory".format(out_dir))
+        return task, csv_path, log_path, ref_paths, out_dir, backend
+
+    '''
+    run:
+        Run a job request on the worker pool and wait for it.
+        Return a dictionary of the result, i.e., status ('ok' or 'failed'), the saved paths (outputs) or the error,
+        and the seconds spent in the queue and in total.
+    '''
+    def run(self, request):
+        task, csv_path, log_path, ref_paths, out_dir, backend = self.getJob(request)
+        submitted_at = time.perf_counter()
+        with self.lock:
+            self.counters['submitted'] += 1
+            self.counters['queued']    += 1
+        # A job waits here until a worker is free, so the number of waiting jobs is the queue depth
+        with self.slots:
+            with self.lock:
+                self.counters['queued']  -= 1
+                self.counters['running'] += 1
+            queue_seconds = time.perf_counter() - submitted_at
+            try:
+                _, save_paths, error = self.executor.submit(runSession, task, csv_path, log_path, ref_paths, out_dir, backend,
+                                                            None, self.log_cache_options).result()
+            except Exception as e:
+                # e.g., a worker process died
+                save_paths, error = [], "{}: {}".format(type(e).__name__, e)
+        seconds = time.perf_counter() - submitted_at
+        with self.lock:
+            self.counters['running'] -= 1
+            self.counters['failed' if error is not None else 'completed'] += 1
+            self.latencies.append(seconds)
+        result = {'status'       : 'ok' if error is None else 'failed',
+                  'task'         : task,
+                  'csv_path'     : csv_path,
+                  'outputs'      : save_paths,
+                  'queue_seconds': queue_seconds,
+                  'seconds'      : seconds}
+        if error is not None:
+            result['error'] = error
+        return result
+
+    '''
+    getStats:
+        Return a dictionary of the counters, and the percentiles of the latencies of the recent jobs.
+    '''
+    def getStats(self, percentiles=[50, 90, 99]):
+        with self.lock:
+            stats = dict(self.counters, num_workers=self.num_workers)
+            latencies = np.array(self.latencies)
+        stats['uptime_seconds'] = time.time() - self.started_at
+        stats['latency_count']  = len(latencies)
+        for percentile in percentiles:
+            stats['latency_seconds_p{}'.format(percentile)] = float(np.percentile(latencies, percentile)) if len(latencies) > 0 else None
+        stats['latency_seconds_max'] = float(latencies.max()) if len(latencies) > 0 else None
+        return stats
+
+    '''
+    warmUp:
+        Start every worker process (and preload the reference tables) before the first job arrives.
+    '''
+    def warmUp(self):
+        for future in [self.executor.submit(os.getpid) for _ in range(self.num_workers)]:
+            future.result()
+
+    '''
+    shutdown:
+        Wait for the running jobs and stop the worker processes.
+    '''
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
+
+'''
+Class ServiceRequestHandler:
+    HTTP endpoints of the service (JSON in and out):
+        POST /jobs   Run a job (see AnalysisService.getJob) and return its result (see AnalysisService.run)
+        GET  /stats  Return the counters of the jobs (see AnalysisService.getStats)
+    A job must be sent as application/json, which a web page can only send to another origin after a CORS preflight
+    that the service never answers, so that a page open in a browser cannot submit jobs.
+'''
+class ServiceRequestHandler(BaseHTTPRequestHandler):
+    # Set by serve()
+    service = None
+
+    def do_GET(self):
+        if self.path.rstrip('/') == '/stats':
+            self.sendJSON(200, self.service.getStats())
+        else:
+            self.sendJSON(404, {'status': 'failed', 'error': "Unknown endpoint: {}".format(self.path)})
+
+    def do_POST(self):
+        if self.path.rstrip('/') != '/jobs':
+            self.sendJSON(404, {'status': 'failed', 'error': "Unknown endpoint: {}".format(self.path)})
+            return
+        if self.headers.get_content_type() != 'application/json':
+            self.sendJSON(415, {'status': 'failed', 'error': "A job must be sent as application/json"})
+            return
+        try:
+            request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+            result  = self.service.run(request)
+        except ValueError as e:
+            self.sendJSON(400, {'status': 'failed', 'error': str(e)})
+            return
+        self.sendJSON(200 if result['status'] == 'ok' else 500, result)
+
+    def sendJSON(self, code, data):
+        body = json.dumps(data).encode('UTF-8')
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def address_string(self):
+        # The client address of a Unix socket is empty
+        return self.client_address[0] if isinstance(self.client_address, tuple) and len(self.client_address) > 0 else 'local'
+
+    def log_message(self, format, *args):
+        print("[INFO] {} {}".format(self.address_string(), format % args))
+
+'''
+Class ThreadingUnixHTTPServer:
+    Same as ThreadingHTTPServer, but listen on a Unix socket, which is only reachable from the same machine.
+'''
+class ThreadingUnixHTTPServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def server_bind(self):
+        if os.path.exists(self.server_address):
+            os.remove(self.server_address)
+        socketserver.UnixStreamServer.server_bind(self)
+        self.server_name, self.server_port = 'localhost', 0
+
+'''
+serve:
+    Serve the jobs over HTTP on host:port, or on a Unix socket if `socket_path` is given, until interrupted.
+'''
+def serve(service, host='127.0.0.1', port=8765, socket_path=None):
+    ServiceRequestHandler.service = service
+    if socket_path is not None:
+        server = ThreadingUnixHTTPServer(socket_path, ServiceRequestHandler)
+        address = socket_path
+    else:
+        server = ThreadingHTTPServer((host, port), ServiceRequestHandler)
+        server.daemon_threads = True
+        address = "http://{}:{}".format(host, server.server_port)
+    # Stop gracefully on SIGTERM as well as on Ctrl+C
+    signal.signal(signal.SIGTERM, lambda *_: threading.Thread(target=server.shutdown).start())
+    print("[INFO] Serving on {} with {} workers".format(address, service.num_workers))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.shutdown()
+        if socket_path is not None and os.path.exists(socket_path):
+            os.remove(socket_path)
+    print("[INFO] Stopped.")
+
+
+def main():
+    '''
+    Parse Arguments
+    '''
+    parser = argparse.ArgumentParser(description='Serve the analysis of single sessions from warm worker processes')
+    parser.add_argument('-host', type=str, default='127.0.0.1',
+                       help='the address to listen on (default: 127.0.0.1, i.e., local connections only)')
+    parser.add_argument('-port', type=int, default=8765,
+                       help='the port to listen on (default: 8765)')
+    parser.add_argument('-socket', type=str, default=None,
+                       help='a path to a Unix socket to listen on instead of -host and -port')
+    parser.add_argument('-nback_ref_path', type=str, default=None,
+                       help='a path to the reference CSV file of N-back (e.g., nback_AB.csv), preloaded by every worker')
+    parser.add_argument('-facematching_ref_path', type=str, default=None,
+                       help='a path to the reference CSV file of Face-matching (e.g., facematching_AB.csv), preloaded by every worker')
+    parser.add_argument('-num_workers', type=int, default=None,
+                       help='the number of worker processes (default: the number of CPUs)')
+    parser.add_argument('-output_backend', type=str, default='csv', choices=OUTPUT_BACKENDS,
+                       help='the output backend of the jobs that do not specify one (default: csv)')
+    parser.add_argument('-out_root', type=str, default='.',
+                       help='a path to the directory under which the jobs save their outputs (default: current directory)')
+    add_log_cache_arguments(parser)
+    args = parser.parse_args()
+    if not os.path.isdir(args.out_root):
+        parser.error('-out_root: {} is not an existing directory'.format(args.out_root))
+
+    ref_paths = {'nback'       : os.path.abspath(args.nback_ref_path) if args.nback_ref_path else None,
+                 'facematching': os.path.abspath(args.facematching_ref_path) if args.facematching_ref_path else None}
+    log_cache_options = None
+    if args.log_cache_dir is not None:
+        log_cache_options = {'log_cache_dir'      : os.path.abspath(args.log_cache_dir),
+                             'log_cache_max_bytes': get_log_cache_max_bytes(args)}
+
+    service = AnalysisService(ref_paths, args.num_workers, args.output_backend, log_cache_options, out_root=args.out_root)
+    service.warmUp()
+    serve(service, args.host, args.port, args.socket)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,242 @@
+import os
+import io
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import tracemalloc
+import contextlib
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from nctlab.nback import merge_nback, aggregate_nback, save_nback
+from nctlab.facematching import merge_facematching, aggregate_facematching, save_facematching
+from nctlab.belt import BELT_Analyzer, save_belt
+from nctlab.banda import read_banda, analyze_banda, save_banda
+from nctlab.output import OUTPUT_BACKENDS
+from synthetic import TASKS, generate_nback_ref, generate_nback_session, generate_facematching_ref, \
+                      generate_facematching_session, generate_belt_session, generate_banda_session
+
+REPORT_VERSION = 1
+
+'''
+getStages:
+    Generate a session of `task` with `num_trials` trials under data_dir.
+    Return (a list of (stage, function) in order, where each function takes the output of the previous stage,
+    and a dictionary of the size of the session).
+    Stages are load, join (N-back and Face-matching) or parse (BELT), aggregate, and write.
+'''
+def getStages(task, num_trials, data_dir, out_dir, backend='csv', seed=0):
+    if task == 'nback':
+        csv_ref_path  = generate_nback_ref(data_dir, num_trials, seed)
+        csv_main_path = generate_nback_session(data_dir, 'SY0000LC00', num_trials, seed+1)
+        stages = [('load',      lambda _: (pd.read_csv(csv_main_path), pd.read_csv(csv_ref_path))),
+                  ('join',      lambda data: merge_nback(*data)),
+                  ('aggregate', aggregate_nback),
+                  ('write',     lambda results: save_nback(results, 'SY0000LC00', out_dir, backend))]
+        input_paths = [csv_main_path, csv_ref_path]
+        num_events  = num_trials
+    elif task == 'facematching':
+        csv_ref_path  = generate_facematching_ref(data_dir, num_trials, seed)
+        csv_main_path = generate_facematching_session(data_dir, 'SY0000LC00', num_trials, seed+1)
+        stages = [('load',      lambda _: (pd.read_csv(csv_main_path), pd.read_csv(csv_ref_path))),
+                  ('join',      lambda data: merge_facematching(*data)),
+                  ('aggregate', aggregate_facematching),
+                  ('write',     lambda results: save_facematching(results, 'SY0000LC00', out_dir, backend))]
+        input_paths = [csv_main_path, csv_ref_path]
+        num_events  = num_trials
+    elif task == 'belt':
+        csv_path, log_path, num_events = generate_belt_session(data_dir, 'SY0000LC00', num_trials, seed+1)
+        def parse(data):
+            my_BELT = BELT_Analyzer(data[0])
+            return my_BELT, my_BELT.getTrialEventsFromLog(data[1])
+        def aggregate(data):
+            my_BELT, trial_events = data
+            my_BELT.setResponseTimeOnMain(*trial_events)
+            return my_BELT.getResults()
+        stages = [('load',      lambda _: (pd.read_csv(csv_path), BELT_Analyzer.readLogEvents(log_path))),
+                  ('parse',     parse),
+                  ('aggregate', aggregate),
+                  ('write',     lambda results: save_belt(results, 'SY0000LC00', out_dir, backend))]
+        input_paths = [csv_path, log_path]
+    elif task == 'banda':
+        csv_path = generate_banda_session(data_dir, 'BANDA0000', num_trials, seed+1)
+        stages = [('load',      lambda _: read_banda(csv_path)),
+                  ('aggregate', analyze_banda),
+                  ('write',     lambda df_data_out: save_banda(df_data_out, csv_path, out_dir, backend))]
+        input_paths = [csv_path]
+        num_events  = num_trials
+    else:
+        raise ValueError("Unknown task: {} (choose from {})".format(task, ', '.join(TASKS)))
+    size = {'num_trials' : num_trials,
+            'num_events' : num_events,
+            'input_bytes': sum(os.path.getsize(path) for path in input_paths)}
+    return stages, size
+
+'''
+runStages:
+    Run every stage once and return ({stage: seconds}, {stage: error message}).
+    If `trace_memory` is set, the peak memory in bytes allocated during each stage is measured instead (see tracemalloc).
+    A stage that raises an exception is recorded as an error, and the following stages are skipped.
+'''
+def runStages(stages, trace_memory=False):
+    measures = {}
+    errors   = {}
+    data = None
+    # Silence [INFO] messages of the write stage
+    with contextlib.redirect_stdout(io.StringIO()):
+        for stage, function in stages:
+            if trace_memory:
+                tracemalloc.reset_peak()
+                memory_before = tracemalloc.get_traced_memory()[0]
+            start = time.perf_counter()
+            try:
+                data = function(data)
+            except Exception as e:
+                errors[stage] = "{}: {}".format(type(e).__name__, e)
+                break
+            measures[stage] = tracemalloc.get_traced_memory()[1] - memory_before if trace_memory else time.perf_counter() - start
+    return measures, errors
+
+'''
+benchmarkTask:
+    Time every stage of a task `repeat` times (the minimum and the median are reported), then run the stages
+    once more with tracemalloc to record the peak memory of each stage.
+    Return a list of result records.
+'''
+def benchmarkTask(task, num_trials, work_dir, repeat=3, backend='csv', seed=0):
+    data_dir = os.path.join(work_dir, 'data')
+    out_dir  = os.path.join(work_dir, 'out')
+    for path in [data_dir, out_dir]:
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path)
+    stages, size = getStages(task, num_trials, data_dir, out_dir, backend, seed)
+
+    seconds = {stage: [] for stage, _ in stages}
+    errors  = {}
+    for _ in range(repeat):
+        measures, errors = runStages(stages)
+        for stage, value in measures.items():
+            seconds[stage].append(value)
+    tracemalloc.start()
+    try:
+        peak_memory, _ = runStages(stages, trace_memory=True)
+    finally:
+        tracemalloc.stop()
+
+    records = []
+    for stage, _ in stages:
+        record = dict(task=task, stage=stage, **size)
+        if len(seconds[stage]) > 0:
+            record['seconds_min']       = float(np.min(seconds[stage]))
+            record['seconds_median']    = float(np.median(seconds[stage]))
+            record['peak_memory_bytes'] = int(peak_memory.get(stage, 0))
+        if stage in errors:
+            record['error'] = errors[stage]
+        records.append(record)
+        if stage in errors:
+            break
+    return records
+
+'''
+getEnvironment:
+    Return a dictionary of the versions that the timings depend on.
+'''
+def getEnvironment():
+    return {'python'  : platform.python_version(),
+            'pandas'  : pd.__version__,
+            'numpy'   : np.__version__,
+            'platform': platform.platform(),
+            'machine' : platform.machine()}
+
+'''
+compareReports:
+    Compare the minimum time of every (task, num_trials, stage) with a previous report.
+    Return a list of the regressions, i.e., stages slower than `threshold` times the previous run.
+    Stages faster than `min_seconds` in both runs are ignored, as their timings are dominated by noise.
+'''
+def compareReports(report, baseline, threshold=1.25, min_seconds=0.01):
+    baseline_records = {(r['task'], r['num_trials'], r['stage']): r for r in baseline['results'] if 'seconds_min' in r}
+    regressions = []
+    for record in report['results']:
+        key = (record['task'], record['num_trials'], record['stage'])
+        if 'seconds_min' not in record or key not in baseline_records:
+            continue
+        before, after = baseline_records[key]['seconds_min'], record['seconds_min']
+        ratio = after / before if before > 0 else np.inf
+        message = "{:<13}{:>7} trials  {:<10}{:>10.4f}s -> {:>10.4f}s (x{:.2f})".format(*key, before, after, ratio)
+        if ratio > threshold and max(before, after) >= min_seconds:
+            print("[WARN] " + message)
+            regressions.append(dict(zip(['task', 'num_trials', 'stage'], key), seconds_before=before, seconds_after=after))
+        else:
+            print("[INFO] " + message)
+    return regressions
+
+
+def main():
+    '''
+    Parse Arguments
+    '''
+    parser = argparse.ArgumentParser(description='Benchmark every analyzer stage over synthetic sessions')
+    parser.add_argument('-tasks', type=str, nargs='+', default=TASKS, choices=TASKS,
+                       help='tasks to benchmark (default: all)')
+    parser.add_argument('-num_trials', type=int, nargs='+', default=[54, 540, 5400, 10800],
+                       help='the numbers of trials of a session (default: 54 540 5400 10800, i.e., up to ~100k BELT log lines)')
+    parser.add_argument('-repeat', type=int, default=3,
+                       help='the number of timed runs of each stage (default: 3)')
+    parser.add_argument('-output_backend', type=str, default='csv', choices=OUTPUT_BACKENDS,
+                       help='the output backend of the write stage (default: csv)')
+    parser.add_argument('-report', type=str, default='benchmark_report.json',
+                       help='a path to the JSON report to write (default: benchmark_report.json)')
+    parser.add_argument('-compare', type=str, default=None,
+                       help='a path to a previous JSON report; exit with 1 if any stage became slower than -threshold times')
+    parser.add_argument('-threshold', type=float, default=1.25,
+                       help='the slowdown ratio reported as a regression (default: 1.25)')
+    parser.add_argument('-work_dir', type=str, default=None,
+                       help='a directory for the synthetic sessions and outputs (default: a temporary directory)')
+    parser.add_argument('-seed', type=int, default=0,
+                       help='a random seed of the synthetic sessions (default: 0)')
+    args = parser.parse_args()
+
+    work_dir = args.work_dir if args.work_dir is not None else tempfile.mkdtemp(prefix='nct_benchmark_')
+    results = []
+    try:
+        for task in args.tasks:
+            for num_trials in args.num_trials:
+                records = benchmarkTask(task, num_trials, work_dir, args.repeat, args.output_backend, args.seed)
+                for record in records:
+                    if 'error' in record:
+                        print("[WARN] {} ({} trials) failed at {}: {}".format(task, num_trials, record['stage'], record['error']))
+                    else:
+                        print("[INFO] {:<13}{:>7} trials {:>8} events  {:<10}{:>10.4f}s {:>10.1f} MB".format(
+                              task, num_trials, record['num_events'], record['stage'], record['seconds_min'], record['peak_memory_bytes']/2**20))
+                results += records
+    finally:
+        if args.work_dir is None:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {'version'       : REPORT_VERSION,
+              'created_at'    : time.strftime('%Y-%m-%dT%H:%M:%S'),
+              'environment'   : getEnvironment(),
+              'repeat'        : args.repeat,
+              'output_backend': args.output_backend,
+              'results'       : results}
+    with open(args.report, mode='w', encoding='UTF-8') as f:
+        json.dump(report, f, indent=1)
+    print("[INFO] Report is saved at {}".format(args.report))
+
+    if args.compare is not None:
+        with open(args.compare, mode='r', encoding='UTF-8') as f:
+            baseline = json.load(f)
+        regressions = compareReports(report, baseline, args.threshold)
+        if len(regressions) > 0:
+            print("[WARN] {} stages are slower than {:.2f}x of {}".format(len(regressions), args.threshold, args.compare))
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
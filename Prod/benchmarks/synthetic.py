@@ -0,0 +1,188 @@
+import os
+import argparse
+import numpy as np
+import pandas as pd
+
+'''
+Synthetic sessions:
+    Generators of every input format with random (but reproducible with `seed`) responses,
+    named like the real exports so that analyze_batch.py detects their task.
+    Each generator writes its files under out_dir and returns their paths.
+'''
+BALLOON_COLORS          = ['blueballoon', 'pinkballoon', 'orangeballoon']
+BALLOON_MAXPUMPS        = [8, 16, 32]
+FACEMATCHING_CONDITIONS = ['neg', 'neu', 'pos', 'fruit', 'veg']
+TASKS                   = ['nback', 'facematching', 'belt', 'banda']
+
+'''
+generate_nback_ref:
+    Write a reference CSV file of N-back (nback_AB.csv) for `num_trials` trials.
+    Every trial is followed by a 'fix' trial, and each block of 10 trials starts with an instruction image.
+'''
+def generate_nback_ref(out_dir, num_trials=60, seed=0):
+    rng = np.random.default_rng(seed)
+    trial      = np.arange(2*num_trials)
+    trial_type = rng.integers(0, 3, size=2*num_trials).astype(object)
+    image_name = np.array(['img{}.jpg'.format(i) for i in trial], dtype=object)
+    is_instr   = (trial % 20) == 0
+    image_name[is_instr] = ['{}back_instr.jpg'.format(t) for t in trial_type[is_instr]]
+    corr_resp  = rng.integers(0, 2, size=2*num_trials).astype(float)
+    is_fix     = (trial % 2) == 1
+    trial_type[is_fix] = 'fix'
+    image_name[is_fix] = 'fix.jpg'
+    corr_resp[is_fix]  = np.nan
+    csv_ref_path = os.path.join(out_dir, 'nback_AB.csv')
+    pd.DataFrame({'trial': trial, 'trial_type': trial_type, 'image_name': image_name, 'corr_resp': corr_resp}).to_csv(csv_ref_path, index=False)
+    return csv_ref_path
+
+'''
+generate_nback_session:
+    Write a main CSV file of N-back with `num_trials` trials (10% of them without response).
+'''
+def generate_nback_session(out_dir, subject_id, num_trials=60, seed=0):
+    rng = np.random.default_rng(seed)
+    rxn_time = rng.random(num_trials) + 0.2
+    rxn_time[rng.random(num_trials) < 0.1] = np.nan
+    csv_main_path = os.path.join(out_dir, '{}_Nback_2021_Jun_09_1034.csv'.format(subject_id))
+    pd.DataFrame({'corr_resp': (rng.random(num_trials) < 0.8).astype(int), 'rxn_time': rxn_time}).to_csv(csv_main_path)
+    return csv_main_path
+
+'''
+generate_facematching_ref:
+    Write a reference CSV file of Face-matching (facematching_AB.csv) for `num_trials` trials.
+'''
+def generate_facematching_ref(out_dir, num_trials=60, seed=0):
+    rng = np.random.default_rng(seed)
+    condition = np.array(FACEMATCHING_CONDITIONS)[rng.integers(0, len(FACEMATCHING_CONDITIONS), size=num_trials)]
+    csv_ref_path = os.path.join(out_dir, 'facematching_AB.csv')
+    pd.DataFrame({'trial': np.arange(1, num_trials+1), 'condition': condition}).to_csv(csv_ref_path, index=False)
+    return csv_ref_path
+
+'''
+generate_facematching_session:
+    Write a main CSV file of Face-matching with `num_trials` trials.
+'''
+def generate_facematching_session(out_dir, subject_id, num_trials=60, seed=0):
+    rng = np.random.default_rng(seed)
+    csv_main_path = os.path.join(out_dir, '{}_FaceMatching_2021_Jun_09_1112.csv'.format(subject_id))
+    pd.DataFrame({'rxn_time'        : rng.random(num_trials) + 0.3,
+                  'percent_accuracy': rng.integers(0, 2, size=num_trials) * 100.0}).to_csv(csv_main_path)
+    return csv_main_path
+
+'''
+generate_belt_session:
+    Write a main CSV file of BELT and its tab-separated PsychoPy log file with `num_trials` balloons.
+    Each trial of the log has a "New trial" line, "Keypress: space" pumps, and either "Popped" or
+    "Keypress: return" followed by "Score", with stray keypresses and other messages in between.
+    Return (csv_path, log_path, the number of log lines).
+'''
+def generate_belt_session(out_dir, subject_id, num_trials=54, seed=0):
+    rng = np.random.default_rng(seed)
+    imgroot      = np.array(BALLOON_COLORS)[rng.integers(0, len(BALLOON_COLORS), size=num_trials)]
+    maxpumps     = np.array(BALLOON_MAXPUMPS)[rng.integers(0, len(BALLOON_MAXPUMPS), size=num_trials)]
+    pumps        = rng.integers(0, 12, size=num_trials)
+    is_popped    = (pumps >= maxpumps//2) & (rng.random(num_trials) < 0.5)
+    balloonscore = np.where(is_popped, 0, pumps)
+
+    lines = ["{:.4f} \tEXP \tCreated window".format(1.0), "{:.4f} \tDATA \tKeypress: space".format(1.1)]
+    t = 2.0
+    for trial in range(num_trials):
+        lines.append("{:.4f} \tEXP \tNew trial (rep=0, index={}): OrderedDict([('imgroot', '{}'), ('maxpumps', {})])".format(t, trial, imgroot[trial], maxpumps[trial]))
+        pump_times = t + np.cumsum(rng.random(pumps[trial])*0.8 + 0.05)
+        for pump_time in pump_times:
+            lines.append("{:.4f} \tDATA \tKeypress: space".format(pump_time))
+        t = (pump_times[-1] if len(pump_times) > 0 else t) + 0.3
+        if is_popped[trial]:
+            lines.append("{:.4f} \tEXP \tPopped".format(t))
+        else:
+            lines.append("{:.4f} \tDATA \tKeypress: return".format(t))
+            lines.append("{:.4f} \tEXP \tScore: {}".format(t+0.01, balloonscore[trial]))
+        if rng.random() < 0.3:
+            # A keypress after the end of the trial is not a response
+            lines.append("{:.4f} \tDATA \tKeypress: space".format(t+0.2))
+        lines.append("{:.4f} \tEXP \tballoon: autoDraw = False".format(t+0.25))
+        t += 1.0 + rng.random()
+
+    csv_path = os.path.join(out_dir, '{}_BELT_TEST_2021_Jun_09_1320.csv'.format(subject_id))
+    log_path = os.path.splitext(csv_path)[0] + '.log'
+    pd.DataFrame({'trials.thisN': np.arange(num_trials), 'imgroot': imgroot, 'maxpumps': maxpumps,
+                  'balloonscore': balloonscore}).to_csv(csv_path, index=False)
+    with open(log_path, mode='w', encoding='UTF-8') as f:
+        f.write('\n'.join(lines) + '\n')
+    return csv_path, log_path, len(lines)
+
+'''
+generate_banda_session:
+    Write a conflict file of BANDA with `num_trials` trials (15% of them without response) and
+    unused columns in between, either comma- or tab-separated (`sep`).
+'''
+def generate_banda_session(out_dir, subject_id, num_trials=64, seed=0, sep=','):
+    rng = np.random.default_rng(seed)
+    is_missed = rng.random(num_trials) < 0.15
+    keys = rng.integers(1, 3, size=num_trials).astype(float)
+    rt   = (rng.random(num_trials) + 0.3).round(4)
+    keys[is_missed] = np.nan
+    rt[is_missed]   = np.nan
+    data = {'facesAreFearful'      : rng.integers(0, 2, size=num_trials),
+            'attendedItemsMatch'   : rng.integers(0, 2, size=num_trials),
+            'facesAreAttended'     : rng.integers(0, 2, size=num_trials),
+            'SameDiffResponse.keys': keys,
+            'SameDiffResponse.rt'  : rt}
+    for i in range(8):
+        data['unused_{}'.format(i)] = rng.random(num_trials)
+    csv_path = os.path.join(out_dir, '{}_Scanner_ABCD_conflict_2017_Jan_22_1515.csv'.format(subject_id))
+    pd.DataFrame(data).to_csv(csv_path, index=False, sep=sep)
+    return csv_path
+
+'''
+generate_cohort:
+    Write `num_sessions` sessions of every task in `tasks` with `num_trials` trials under out_dir,
+    and the reference CSV files under out_dir/refs.
+    Return a dictionary of the paths, i.e., {'refs': {task: path}, 'sessions': {task: [paths]}}.
+'''
+def generate_cohort(out_dir, num_sessions=1, num_trials=60, tasks=TASKS, seed=0):
+    ref_dir = os.path.join(out_dir, 'refs')
+    os.makedirs(ref_dir, exist_ok=True)
+    paths = {'refs': {}, 'sessions': {task: [] for task in tasks}}
+    if 'nback' in tasks:
+        paths['refs']['nback'] = generate_nback_ref(ref_dir, num_trials, seed)
+    if 'facematching' in tasks:
+        paths['refs']['facematching'] = generate_facematching_ref(ref_dir, num_trials, seed)
+    for session in range(num_sessions):
+        subject_id   = 'SY{:04d}LC00'.format(session)
+        session_seed = seed + session + 1
+        if 'nback' in tasks:
+            paths['sessions']['nback'].append(generate_nback_session(out_dir, subject_id, num_trials, session_seed))
+        if 'facematching' in tasks:
+            paths['sessions']['facematching'].append(generate_facematching_session(out_dir, subject_id, num_trials, session_seed))
+        if 'belt' in tasks:
+            paths['sessions']['belt'].append(generate_belt_session(out_dir, subject_id, num_trials, session_seed)[:2])
+        if 'banda' in tasks:
+            paths['sessions']['banda'].append(generate_banda_session(out_dir, 'BANDA{:04d}'.format(session), num_trials, session_seed))
+    return paths
+
+
+def main():
+    '''
+    Parse Arguments
+    '''
+    parser = argparse.ArgumentParser(description='Generate synthetic sessions of every task')
+    parser.add_argument('-out_dir', type=str, required=True,
+                       help='a path to the directory where the sessions are written (reference CSV files are written under out_dir/refs)')
+    parser.add_argument('-num_sessions', type=int, default=1,
+                       help='the number of sessions of each task (default: 1)')
+    parser.add_argument('-num_trials', type=int, default=60,
+                       help='the number of trials of each session (default: 60)')
+    parser.add_argument('-tasks', type=str, nargs='+', default=TASKS, choices=TASKS,
+                       help='tasks to generate (default: all)')
+    parser.add_argument('-seed', type=int, default=0,
+                       help='a random seed (default: 0)')
+    args = parser.parse_args()
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    generate_cohort(args.out_dir, args.num_sessions, args.num_trials, args.tasks, args.seed)
+    print("[INFO] Generated {} sessions of {} under {}".format(args.num_sessions, ', '.join(args.tasks), args.out_dir))
+
+
+if __name__ == '__main__':
+    main()
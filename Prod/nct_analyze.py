@@ -0,0 +1,135 @@
+import os
+import sys
+import time
+import argparse
+import importlib
+
+STARTED_AT = time.perf_counter()
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Only the standard library (and nctlab.cli, which imports nothing else) is imported until the arguments are validated,
+# so that -h or a wrong path returns immediately. pandas, numpy and the module of the chosen task are imported right before the analysis.
+from nctlab.cli import add_task_arguments, check_belt_arguments, get_log_cache_max_bytes, get_bootstrap_options, get_instrument_options
+
+# Task -> the module of nctlab that analyzes it
+TASK_MODULES = {'nback'             : 'nback',
+                'facematching'      : 'facematching',
+                'belt'              : 'belt',
+                'banda'             : 'banda',
+                'banda_facematching': 'banda_facematching',
+                'spec'              : 'taskspec'}
+
+'''
+getParser:
+    Return the parser of the command line, i.e., nct_analyze.py [-import_times] <task> <arguments of the task>.
+    The arguments of each task are the same as its script (e.g., Task3_BELT/analyze_BELT.py), see nctlab/cli.py.
+'''
+def getParser():
+    parser = argparse.ArgumentParser(description='Analyze a single session of any task')
+    parser.add_argument('-import_times', action='store_true',
+                       help='print how long the startup took, i.e., parsing the arguments, importing each module and the analysis')
+    subparsers = parser.add_subparsers(dest='task', metavar='task', help='one of {}'.format(', '.join(TASK_MODULES)))
+    subparsers.required = True
+
+    descriptions = {'nback'             : 'Analyze N-back',
+                    'facematching'      : 'Analyze Face-matching',
+                    'belt'              : 'Analyze BELT',
+                    'banda'             : 'Analyze BANDA',
+                    'banda_facematching': 'Analyze Face-matching of BANDA',
+                    'spec'              : 'Analyze a table-based task declared by a task spec (see nctlab/taskspec.py)'}
+    for task in TASK_MODULES:
+        subparser = subparsers.add_parser(task, description=descriptions[task])
+        add_task_arguments(subparser, task)
+    return parser
+
+'''
+validateArguments:
+    Check the inputs before importing pandas: every input file exists, the output directory exists, and
+    the log file of BELT belongs to the same subject as the CSV file (i.e., their filenames start with the same subject id).
+    Exit with an error message of the parser otherwise.
+'''
+def validateArguments(parser, args):
+    if args.task == 'belt':
+        check_belt_arguments(parser, args)
+    for name in ['csv_main_path', 'csv_ref_path', 'csv_path', 'log_path', 'spec_path']:
+        # The files of a running session are not written yet when following it
+        if getattr(args, 'follow', False) and name in ['csv_path', 'log_path']:
+            continue
+        path = getattr(args, name, None)
+        if path is not None and not os.path.isfile(path):
+            parser.error("-{}: {} is not found".format(name, path))
+    args.bootstrap_options = get_bootstrap_options(args, parser)
+    if not os.path.isdir(args.out_dir):
+        parser.error("-out_dir: {} is not a directory".format(args.out_dir))
+
+'''
+importTimed:
+    Import a module and record the seconds it took in `import_times` (modules already imported take no time).
+'''
+def importTimed(module_name, import_times):
+    start = time.perf_counter()
+    module = importlib.import_module(module_name)
+    import_times.append(('import ' + module_name, time.perf_counter() - start))
+    return module
+
+'''
+runTask:
+    Import the module of the task only, and run the analysis of the session (recording its stages if -instrument_log is given).
+'''
+def runTask(args, import_times):
+    # numpy and pandas are imported by the module anyway; importing them first tells their share of the time
+    importTimed('numpy', import_times)
+    importTimed('pandas', import_times)
+    module = importTimed('nctlab.' + TASK_MODULES[args.task], import_times)
+    instrument = importTimed('nctlab.instrument', import_times)
+    session_path = args.csv_main_path if args.task in ('nback', 'facematching') else args.csv_path
+    with instrument.instrument_run(args.task, session_path, get_instrument_options(args)):
+        return runAnalysis(module, args)
+
+'''
+runAnalysis:
+    Run the analysis of the session with the module of the task.
+'''
+def runAnalysis(module, args):
+    bootstrap = args.bootstrap_options
+    if args.task == 'nback':
+        return module.run_nback(args.csv_main_path, args.csv_ref_path, args.out_dir, args.output_backend, bootstrap)
+    if args.task == 'facematching':
+        return module.run_facematching(args.csv_main_path, args.csv_ref_path, args.out_dir, args.output_backend, bootstrap)
+    if args.task == 'belt' and args.follow:
+        return module.run_belt_follow(args.csv_path, args.log_path, args.out_dir, args.output_backend, args.poll_interval, args.idle_timeout,
+                                      args.num_blocks, args.block_size, bootstrap)
+    if args.task == 'belt':
+        return module.run_belt(args.csv_path, args.log_path, args.out_dir, stream_log=args.stream_log, log_chunksize=args.log_chunksize,
+                               backend=args.output_backend, log_cache_dir=args.log_cache_dir, log_cache_max_bytes=get_log_cache_max_bytes(args),
+                               num_blocks=args.num_blocks, block_size=args.block_size, bootstrap=bootstrap)
+    if args.task == 'banda':
+        return module.run_banda(args.csv_path, args.out_dir, args.output_backend, args.use_pyarrow, bootstrap)
+    if args.task == 'banda_facematching':
+        return module.run_banda_facematching(args.csv_path, args.out_dir, args.output_backend, args.use_pyarrow, bootstrap)
+    return module.run_task_spec(args.spec_path, args.csv_path, args.csv_ref_path, args.out_dir, args.output_backend, bootstrap)
+
+
+def main():
+    '''
+    Parse Arguments
+    '''
+    parser = getParser()
+    args = parser.parse_args()
+    validateArguments(parser, args)
+    startup_times = [('arguments', time.perf_counter() - STARTED_AT)]
+
+    start = time.perf_counter()
+    runTask(args, startup_times)
+    analysis_seconds = time.perf_counter() - start - sum(seconds for name, seconds in startup_times if name.startswith('import '))
+    print("[INFO] Completed.")
+
+    if args.import_times:
+        startup_times.append(('analysis', analysis_seconds))
+        print("[INFO] Time breakdown (see also python -X importtime):")
+        for name, seconds in startup_times:
+            print("{:<32}{:>8.3f}s".format(name, seconds))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+'''
+nctlab:
+    Analysis logic of every task as functions that take dataframes and return dataframes.
+    The scripts of each task (e.g., Task1_N-Back/analyze_Nback.py) are thin command line wrappers around them.
+    The modules of each task are imported on first use, so importing a single task (e.g., nctlab.belt) does not
+    import the others.
+'''
+import importlib
+
+# Exported name -> the module of the task that defines it
+_EXPORTS = {'analyze_nback'             : 'nback',
+            'run_nback'                 : 'nback',
+            'analyze_facematching'      : 'facematching',
+            'run_facematching'          : 'facematching',
+            'BELT_Analyzer'             : 'belt',
+            'analyze_belt'              : 'belt',
+            'analyze_belt_stream'       : 'belt',
+            'run_belt'                  : 'belt',
+            'analyze_belt_cohort'       : 'belt',
+            'run_belt_cohort'           : 'belt',
+            'analyze_banda'             : 'banda',
+            'run_banda'                 : 'banda',
+            'analyze_banda_facematching': 'banda_facematching',
+            'run_banda_facematching'    : 'banda_facematching',
+            'compile_task_spec'         : 'taskspec',
+            'run_task_spec'             : 'taskspec',
+            'bootstrap_ci'              : 'bootstrap',
+            'bootstrap_cohort_ci'       : 'bootstrap'}
+
+__all__ = list(_EXPORTS)
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+    value = getattr(importlib.import_module('.' + _EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
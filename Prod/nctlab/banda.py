@@ -0,0 +1,132 @@
+import os
+from .output import save_output, get_session_ids
+from .loader import read_table
+from .instrument import instrument_stage
+from .taskspec import compile_task_spec, to_number, to_choice
+
+ANALYZER_VERSION = 'Ver. 1 (5/5/2022)'
+
+# Factor columns that define the conditions, and their levels
+BANDA_FACTORS = {'facesAreFearful' : [0, 1],
+                 'facesAreAttended': [0, 1]}
+# Labels of the conditions (in the order of itertools.product of the levels)
+BANDA_CONDITION_LABELS = ['Fearful & Attended', 'Fearful & NOT Attended', 'NOT Fearful & Attended', 'NOT Fearful & NOT Attended']
+
+# Response columns, and the types they are parsed with (response keys are float, as no response is NaN).
+# A column with a non-numeric cell (e.g., a response key 'space') is read as strings (see loader.read_table)
+BANDA_RESPONSE_DTYPES = {'attendedItemsMatch'   : float,
+                         'SameDiffResponse.keys': float,
+                         'SameDiffResponse.rt'  : float}
+
+'''
+get_banda_spec:
+    Return the task spec of BANDA (see taskspec) given the factor columns with their levels and the labels of the conditions.
+
+1. Use column A/K to define condition.
+    - Column A: facesAreFearful (0 or 1)
+    - Column K: facesAreAttended (0 or 1)
+    - Thus, a total of 4 possible conditions
+
+2. Use column T for response time.
+    - Column T: SameDiffResponse.rt
+    
+3. Use column S compared to H
+    - Column S: SameDiffResponse.keys
+        - identical = 1
+        - different = 2
+    - Column H: attendedItemsMatch
+        - identical = 1
+        - different = 0
+        
+Given the above, group data by condition -> a total of 4 possible conditions
+'''
+def get_banda_spec(factors=BANDA_FACTORS, labels=None):
+    factor_names = list(factors.keys())
+    return {'name'   : 'banda',
+            'main'   : {'dtypes': dict(BANDA_RESPONSE_DTYPES, **{factor_name: float for factor_name in factor_names})},
+            # Normalize the response columns once for every condition
+            'derive' : {'rt'           : ['number', 'SameDiffResponse.rt'],
+                        'response_keys': ['choice', 'SameDiffResponse.keys', [1, 2]],
+                        # H = S = identical or H = S = different
+                        'is_right'     : ['any', [[('response_keys', '==', 1), ('attendedItemsMatch', '==', 1)],
+                                                  [('response_keys', '==', 2), ('attendedItemsMatch', '==', 0)]]]},
+            # Only the listed levels of each factor define a condition
+            'filters': [(factor_name, 'isin', levels) for factor_name, levels in factors.items()],
+            # Average response time (the mean of each condition is computed the same way as Series.mean),
+            # and the number of right and wrong answers for each condition
+            'outputs': {'analyzed_conflict': {'by'      : factor_names,
+                                              'levels'  : factors,
+                                              'labels'  : labels,
+                                              'metrics' : [('Avg Response Time', 'series_mean', 'rt'),
+                                                           ('Num of Right Ans', 'count_true', 'is_right'),
+                                                           ('Numb of Wrong Ans', 'count_false', 'is_right')],
+                                              'layout'  : 'text',
+                                              'filename': 'analyzed_{session_id}'}}}
+
+BANDA_PLAN = compile_task_spec(get_banda_spec(BANDA_FACTORS, BANDA_CONDITION_LABELS))
+
+'''
+read_banda:
+    Read a BANDA conflict file, which is either comma- or tab-separated.
+    Only the factor and response columns are parsed (see loader.read_table).
+'''
+def read_banda(csv_path, factors=BANDA_FACTORS, use_pyarrow=False):
+    dtype = dict(BANDA_RESPONSE_DTYPES, **{factor_name: float for factor_name in factors})
+    return read_table(csv_path, usecols=list(dtype.keys()), dtype=dtype, use_pyarrow=use_pyarrow)
+
+'''
+normalize_banda_rt:
+    Return the response time column as float (see taskspec.to_number).
+'''
+def normalize_banda_rt(rt):
+    return to_number(rt)
+
+'''
+normalize_banda_keys:
+    Return the response key column as float (1: identical, 2: different, NaN: no or invalid response, see taskspec.to_choice).
+'''
+def normalize_banda_keys(keys):
+    return to_choice(keys, [1, 2])
+
+'''
+analyze_banda:
+    Get the conflict dataframe (e.g., BANDAXXX_Scanner_ABCD_conflict_XXXX_XXX_XX_XXXX.csv).
+    Return the output dataframe (see get_banda_spec).
+
+Other variants of BANDA can pass any number of factor columns with their levels (`factors`) and the labels of
+their conditions (`labels`, in the order of itertools.product of the levels). If no labels are given,
+each condition is labeled with its factor levels (e.g., "facesAreFearful=0 & facesAreAttended=1").
+If `bootstrap` options are given (see bootstrap.py), the average response time is followed by the bounds of its bootstrap interval.
+'''
+def analyze_banda(conflict_data, factors=BANDA_FACTORS, labels=None, bootstrap=None):
+    if factors is BANDA_FACTORS and labels is None:
+        plan = BANDA_PLAN
+    else:
+        plan = compile_task_spec(get_banda_spec(factors, labels))
+    return plan.aggregate(conflict_data, bootstrap)['analyzed_conflict']
+
+'''
+save_banda:
+    Save the output dataframe as analyzed_<CSV filename>.csv (or with the given output backend) under out_dir.
+    Return a list of the saved paths.
+'''
+def save_banda(df_data_out, csv_path, out_dir='.', backend='csv'):
+    subject_id, session_id = get_session_ids(csv_path)
+    save_filename = save_output(df_data_out, out_dir, 'analyzed_' + session_id, backend, False, 'banda', 'analyzed_conflict', subject_id, session_id)
+    print("[INFO] Output is saved as {}".format(save_filename))
+    return [save_filename]
+
+'''
+run_banda:
+    Read, analyze and save a single session (see analyze_banda for `bootstrap`).
+'''
+def run_banda(csv_path, out_dir='.', backend='csv', use_pyarrow=False, bootstrap=None):
+    print("[INFO] Processing {}...".format(csv_path))
+    with instrument_stage('banda', 'load') as record:
+        conflict_data = read_banda(csv_path, use_pyarrow=use_pyarrow)
+        record['rows'] = len(conflict_data)
+    with instrument_stage('banda', 'aggregate') as record:
+        df_data_out = analyze_banda(conflict_data, bootstrap=bootstrap)
+        record['rows'] = len(conflict_data)
+    with instrument_stage('banda', 'write'):
+        return save_banda(df_data_out, csv_path, out_dir, backend)
@@ -0,0 +1,75 @@
+import os
+from .output import save_output, get_session_ids
+from .loader import read_table
+from .instrument import instrument_stage
+from .taskspec import compile_task_spec
+
+ANALYZER_VERSION = 'Ver. 1 (5/5/2022)'
+
+# Columns used for the analysis, and the types they are parsed with
+FACEMATCHING_DTYPES = {'Condition'          : str,
+                       'key_resp_trial.rt'  : float,
+                       'key_resp_trial.corr': float}
+
+# Task spec of the Face-matching of BANDA (see taskspec)
+BANDA_FACEMATCHING_SPEC = {'name'   : 'banda_facematching',
+                     'main'   : {'dtypes': FACEMATCHING_DTYPES},
+                     'outputs': {'analyzed_facematching': {'by'        : ['Condition'],
+                                                           # Part 1: (1) average response time (found in R (i.e., key_resp_trial.rt)) and
+                                                           # (2) number of correct responses (found in Q (i.e., key_resp_trial.corr)) per condition
+                                                           'metrics'   : [('Avg Response Time', 'mean', 'key_resp_trial.rt'),
+                                                                          ('Num of Correct Resp', 'count_true', 'key_resp_trial.corr')],
+                                                           # Part 2: average response time for correct and incorrect responses
+                                                           'extra_rows': [{'label': '-'},
+                                                                          {'label'  : 'Corr Resp',
+                                                                           'filters': [('key_resp_trial.corr', '==', 1)],
+                                                                           'metrics': [('Avg Response Time', 'mean', 'key_resp_trial.rt')]},
+                                                                          {'label'  : 'Incorr Resp',
+                                                                           'filters': [('key_resp_trial.corr', '==', 0)],
+                                                                           'metrics': [('Avg Response Time', 'mean', 'key_resp_trial.rt')]}],
+                                                           'layout'    : 'text',
+                                                           'filename'  : 'analyzed_{session_id}'}}}
+BANDA_FACEMATCHING_PLAN = compile_task_spec(BANDA_FACEMATCHING_SPEC)
+
+'''
+read_banda_facematching:
+    Read a Face-matching file of BANDA, which is either comma- or tab-separated.
+    Only the columns used for the analysis are parsed (see loader.read_table).
+'''
+def read_banda_facematching(csv_path, use_pyarrow=False):
+    return read_table(csv_path, usecols=list(FACEMATCHING_DTYPES.keys()), dtype=FACEMATCHING_DTYPES, use_pyarrow=use_pyarrow)
+
+'''
+analyze_banda_facematching:
+    Get the Face-matching dataframe (e.g., BANDAXXX_Scanner_AB_FaceMatching_XXX_XXX_XX_XXXX.csv).
+    Return the output dataframe (see BANDA_FACEMATCHING_SPEC).
+    If `bootstrap` options are given (see bootstrap.py), the average response times are followed by the bounds of their bootstrap interval.
+'''
+def analyze_banda_facematching(face_data, bootstrap=None):
+    return BANDA_FACEMATCHING_PLAN.aggregate(face_data, bootstrap)['analyzed_facematching']
+
+'''
+save_banda_facematching:
+    Save the output dataframe as analyzed_<CSV filename>.csv (or with the given output backend) under out_dir.
+    Return a list of the saved paths.
+'''
+def save_banda_facematching(df_data_out, csv_path, out_dir='.', backend='csv'):
+    subject_id, session_id = get_session_ids(csv_path)
+    save_filename = save_output(df_data_out, out_dir, 'analyzed_' + session_id, backend, False, 'banda_facematching', 'analyzed_facematching', subject_id, session_id)
+    print("[INFO] Output is saved as {}".format(save_filename))
+    return [save_filename]
+
+'''
+run_banda_facematching:
+    Read, analyze and save a single session (see analyze_banda_facematching for `bootstrap`).
+'''
+def run_banda_facematching(csv_path, out_dir='.', backend='csv', use_pyarrow=False, bootstrap=None):
+    print("[INFO] Processing {}...".format(csv_path))
+    with instrument_stage('banda_facematching', 'load') as record:
+        face_data = read_banda_facematching(csv_path, use_pyarrow)
+        record['rows'] = len(face_data)
+    with instrument_stage('banda_facematching', 'aggregate') as record:
+        df_data_out = analyze_banda_facematching(face_data, bootstrap)
+        record['rows'] = len(face_data)
+    with instrument_stage('banda_facematching', 'write'):
+        return save_banda_facematching(df_data_out, csv_path, out_dir, backend)
@@ -0,0 +1,968 @@
+import os
+import io
+import re
+import csv
+import time
+import itertools
+import pandas as pd
+import numpy as np
+from .output import save_output, get_session_ids
+from .instrument import instrument_stage
+from .logcache import load_log_cache
+from .bootstrap import bootstrap_ci, bootstrap_grouped_ci, bootstrap_cohort_ci
+
+# Columns of the tab-separated PsychoPy log file
+LOG_COLUMNS = ['timestamp', 'datatype', 'msg']
+# Event flags of a log entry (see BELT_Analyzer.classifyLogEvents)
+LOG_EVENT_NEW_TRIAL = 1
+LOG_EVENT_TRIAL_END = 2
+LOG_EVENT_KEYPRESS  = 4
+# Balloon colors of getBalloonPointsAndPops, and the thirds of a session (task 6)
+BALLOON_COLORS = [('blueballoon', 'blue'), ('pinkballoon', 'pink'), ('orangeballoon', 'orange')]
+SESSION_THIRDS = ['first_third', 'second_third', 'last_third']
+
+'''
+Class BELT_Analyzer:
+    The main purpose of this class is to store dataframe of csv and log file.
+    Various functions to compute response time and poppedness of balloons are also included.
+'''
+class BELT_Analyzer:
+    def __init__(self, data_main, data_log=None):
+        self.data_main     = data_main.copy()
+        self.data_log      = data_log
+        # Timestamps of the events of every trial, as a flat array and the start offsets of each trial
+        self.event_timestamp = None
+        self.trial_offsets   = None
+        if data_log is not None:
+            self.setResponseTimeOnMainFromLog(self.data_log)
+    
+    '''
+    computeResTime:
+        Get an array containing a sequence of timestamp.
+        Return an array containing the time differences.
+        e.g.) input <- [1,4,12,13]
+              output <- [3,8,1]
+    '''
+    def computeResTime(self, timelist):
+        if(len(timelist)<2):
+            return [np.nan]
+        else:
+            diff = timelist[1:] - timelist[:-1]
+            return diff
+    
+    '''
+    computeResTimeOnset:
+        Get an array containing a sequence of timestamp.
+        Return the first reaction time after a ballon is presented.
+        e.g.) input <- [1,4,12,13]
+              output <- 3 (i.e., 4-1)
+    '''
+    def computeResTimeOnset(self, timelist):
+        if(len(timelist)<2):
+            return np.nan
+        else:
+            return timelist[1]-timelist[0]
+        
+    '''
+    computeTrialDuration:
+        Get an array containing a sequence of timestamp.
+        Return the duration of timestamp.
+        e.g.) input <- [1,4,12,13]
+              output <- 12 (i.e., 13-1)
+    '''
+    def computeTrialDuration(self, timelist):
+        if(len(timelist)<2):
+            return 0.0
+        else:
+            return timelist[-1]-timelist[0]
+
+    
+    '''
+    getBalloonPointsAndPops:
+
+    '''
+    def getBalloonPointsAndPops(self, dataframe):
+        # blueballoon
+        blueballoon_points = np.sum(dataframe[dataframe['imgroot']=='blueballoon']['balloonscore'].values)
+        blueballoon_pops   = len(np.argwhere(dataframe[dataframe['imgroot']=='blueballoon']['balloonscore'].values==0))
+        # pinkballoon
+        pinkballoon_points = np.sum(dataframe[dataframe['imgroot']=='pinkballoon']['balloonscore'].values)
+        pinkballoon_pops   = len(np.argwhere(dataframe[dataframe['imgroot']=='pinkballoon']['balloonscore'].values==0))
+        # orangeballoon
+        orangeballoon_points = np.sum(dataframe[dataframe['imgroot']=='orangeballoon']['balloonscore'].values)
+        orangeballoon_pops   = len(np.argwhere(dataframe[dataframe['imgroot']=='orangeballoon']['balloonscore'].values==0))
+        result = {"blue_score"  : [blueballoon_points],
+                  "blue_pops"   : [blueballoon_pops],
+                  "pink_score"  : [pinkballoon_points],
+                  "pink_pops"   : [pinkballoon_pops],
+                  "orange_score": [orangeballoon_points],
+                  "orange_pops" : [orangeballoon_pops]}
+        return result
+
+    
+    '''
+    parseLog:
+        Parse tab-separated log lines in bulk.
+        The timestamp column is coerced to float, and malformed rows (e.g., multi-line messages) are dropped.
+    '''
+    @staticmethod
+    def parseLog(log_source):
+        try:
+            data_log = pd.read_csv(log_source, sep='\t', header=None, names=LOG_COLUMNS, usecols=[0,1,2],
+                                   dtype=str, keep_default_na=False, quoting=csv.QUOTE_NONE, encoding='UTF-8')
+        except pd.errors.ParserError:
+            # Corner case: none of the lines has three columns (every line is malformed).
+            return pd.DataFrame({'timestamp':np.empty(0), 'datatype':np.empty(0, dtype=object), 'msg':np.empty(0, dtype=object)})
+        data_log['timestamp'] = pd.to_numeric(data_log['timestamp'], errors='coerce')
+        data_log = data_log.dropna(subset=['timestamp']).reset_index(drop=True)
+        data_log['datatype'] = data_log['datatype'].str.rstrip()
+        data_log['msg']      = data_log['msg'].str.rstrip()
+        return data_log
+    
+    '''
+    readLog:
+        Read .log file and store data into dataframe
+    '''
+    @staticmethod
+    def readLog(log_path):
+        return BELT_Analyzer.parseLog(log_path)
+    
+    '''
+    classifyLogEvents:
+        Get a series of log messages.
+        Return an int8 array of the event flags of every message (LOG_EVENT_*), i.e.,
+        "New trial", the end of trial ("Popped" or "Score") and "Keypress: space/return" that does not end the trial.
+        Each distinct message is classified only once.
+    '''
+    @staticmethod
+    def classifyLogEvents(msg):
+        codes, uniques = pd.factorize(msg)
+        uniques = pd.Series(np.asarray(uniques, dtype=object)).astype(str)
+        is_new_trial = uniques.str.startswith('New trial').values
+        is_trial_end = uniques.str.contains('Popped|Score').values
+        is_keypress  = (~is_trial_end) & (uniques.str.startswith('Keypress: space') | uniques.str.startswith('Keypress: return')).values
+        event = (is_new_trial*LOG_EVENT_NEW_TRIAL | is_trial_end*LOG_EVENT_TRIAL_END | is_keypress*LOG_EVENT_KEYPRESS).astype(np.int8)
+        return np.where(codes >= 0, event[np.maximum(codes, 0)], 0).astype(np.int8)
+    
+    '''
+    parseLogTable:
+        Parse tab-separated log lines into a dataframe of the timestamp (float64), the event flags (int8, see classifyLogEvents)
+        and the message (categorical, i.e., an id per distinct message) of every entry.
+        The message column is left out if `messages` is False. Malformed rows are dropped the same way as parseLog.
+    '''
+    @staticmethod
+    def parseLogTable(log_source, messages=True):
+        try:
+            # The timestamps are parsed as float directly, unless some lines do not start with a number
+            data_log = pd.read_csv(log_source, sep='\t', header=None, names=LOG_COLUMNS, usecols=['timestamp','msg'],
+                                   dtype={'timestamp':np.float64, 'msg':str}, keep_default_na=False, quoting=csv.QUOTE_NONE, encoding='UTF-8')
+        except ValueError:
+            if hasattr(log_source, 'seek'):
+                log_source.seek(0)
+            data_log = BELT_Analyzer.parseLog(log_source)
+        if not messages:
+            return pd.DataFrame({'timestamp': data_log['timestamp'].values.astype(np.float64),
+                                 'event'    : BELT_Analyzer.classifyLogEvents(data_log['msg'])})
+        codes, uniques = pd.factorize(data_log['msg'])
+        # Messages that only differ in trailing whitespaces are the same message (see parseLog)
+        uniques_codes, uniques = pd.factorize(pd.Series(np.asarray(uniques, dtype=object)).astype(str).str.rstrip())
+        msg = pd.Categorical.from_codes(uniques_codes[codes], categories=uniques)
+        return pd.DataFrame({'timestamp': data_log['timestamp'].values.astype(np.float64),
+                             'event'    : BELT_Analyzer.classifyLogEvents(pd.Series(msg)),
+                             'msg'      : msg})
+    
+    '''
+    parseLogEvents:
+        Parse tab-separated log lines into a compact dataframe of the timestamp (float64) and the event flags (int8)
+        of every entry, without keeping the message strings (see parseLogTable).
+    '''
+    @staticmethod
+    def parseLogEvents(log_source):
+        return BELT_Analyzer.parseLogTable(log_source, messages=False)
+    
+    '''
+    readLogEvents:
+        Read .log file into a compact dataframe of the timestamp and the event flags of every entry (see parseLogEvents).
+        It can be passed to BELT_Analyzer and analyze_belt in place of the dataframe of readLog.
+    '''
+    @staticmethod
+    def readLogEvents(log_path):
+        return BELT_Analyzer.parseLogEvents(log_path)
+    
+    '''
+    readLogCached:
+        Same as parseLogTable of .log file, but the parsed table is cached as a binary file under cache_dir the first time,
+        and memory-mapped afterwards instead of parsing the text again (see logcache.load_log_cache).
+        If `max_bytes` is given, the least recently used caches are evicted to keep cache_dir below max_bytes.
+    '''
+    @staticmethod
+    def readLogCached(log_path, cache_dir, max_bytes=None):
+        return load_log_cache(log_path, BELT_Analyzer.parseLogTable, 'belt', cache_dir, max_bytes)
+    
+    '''
+    iterLogChunks:
+        Read .log file in chunks of `chunksize` lines.
+        Yield dataframes that only contain complete trials, i.e., each chunk (except the lines
+        before the very first "New trial") starts with "New trial" and a trial is never split across chunks.
+    '''
+    @staticmethod
+    def iterLogChunks(log_path, chunksize=100000):
+        data_carry = None
+        with open(log_path, mode='r', encoding='UTF-8') as f:
+            while True:
+                lines = list(itertools.islice(f, chunksize))
+                if len(lines)==0:
+                    break
+                data_chunk = BELT_Analyzer.parseLog(io.StringIO(''.join(lines)))
+                if data_carry is not None:
+                    data_chunk = pd.concat([data_carry, data_chunk], ignore_index=True)
+                new_trial_idx = np.flatnonzero(data_chunk['msg'].str.startswith('New trial').values)
+                # The last trial of this chunk may continue in the next chunk
+                if len(new_trial_idx)==0:
+                    if data_carry is None:
+                        yield data_chunk
+                    else:
+                        data_carry = data_chunk
+                    continue
+                if new_trial_idx[-1]>0:
+                    yield data_chunk[:new_trial_idx[-1]]
+                data_carry = data_chunk[new_trial_idx[-1]:].reset_index(drop=True)
+        if data_carry is not None:
+            yield data_carry
+    
+    '''
+    iterLogTrials:
+        Read .log file as a generator of trial-by-trial event blocks.
+        Each block starts with "New trial" and contains every log entry until the next "New trial".
+    '''
+    @staticmethod
+    def iterLogTrials(log_path, chunksize=100000):
+        for data_chunk in BELT_Analyzer.iterLogChunks(log_path, chunksize):
+            trial_id = np.cumsum(data_chunk['msg'].str.startswith('New trial').values)
+            for _, data_trial in data_chunk[trial_id>0].groupby(trial_id[trial_id>0], sort=False):
+                yield data_trial
+    
+    '''
+    getTrialEventsFromLog:
+        Classify every log message in bulk and keep the events that make up each trial,
+        i.e., the "New trial" onset followed by the "Keypress: space/return" actions
+        until the trial ends (based on "Popped" or "Score").
+        Return (1) an array of timestamps of the kept events and (2) an array of
+        start offsets of each trial into the timestamps.
+        e.g.) msg   <- [New trial, Keypress: space, Popped, Keypress: space, New trial, Keypress: return]
+              ts    <- [1,         4,               5,      6,               12,        13]
+              output <- ([1,4,12,13], [0,2])
+    '''
+    def getTrialEventsFromLog(self, data_log):
+        # The event flags are already there if the log is read by readLogEvents
+        event     = data_log['event'].values if 'event' in data_log.columns else self.classifyLogEvents(data_log['msg'])
+        timestamp = data_log['timestamp'].values.astype(np.float64)
+        
+        is_new_trial = (event & LOG_EVENT_NEW_TRIAL) > 0
+        # A flag for indicating the end of trial (based on "popped" or "score")
+        is_trial_end = (event & LOG_EVENT_TRIAL_END) > 0
+        is_keypress  = (event & LOG_EVENT_KEYPRESS) > 0
+        
+        # Every "New trial" opens a new trial id. Events before the very first "New trial" get id 0 and are skipped.
+        trial_id = np.cumsum(is_new_trial)
+        # Number of trial-end messages seen so far within the same trial (keypresses after the end are skipped)
+        end_count       = np.cumsum(is_trial_end)
+        end_count_start = np.concatenate([[0], (end_count - is_trial_end)[is_new_trial]])
+        trial_end_count = end_count - end_count_start[trial_id]
+        
+        is_event = is_new_trial | (is_keypress & (trial_id > 0) & (trial_end_count == 0))
+        event_timestamp = timestamp[is_event]
+        trial_offsets   = np.flatnonzero(is_new_trial[is_event])
+        return event_timestamp, trial_offsets
+    
+    '''
+    getTrialEventsFromLogStream:
+        Same as getTrialEventsFromLog, but read .log file chunk-by-chunk so that only the events are kept in memory.
+    '''
+    def getTrialEventsFromLogStream(self, log_path, chunksize=100000):
+        event_timestamp = []
+        trial_size      = []
+        for data_chunk in self.iterLogChunks(log_path, chunksize):
+            _event_timestamp, _trial_offsets = self.getTrialEventsFromLog(data_chunk)
+            event_timestamp.append(_event_timestamp)
+            trial_size.append(np.diff(np.append(_trial_offsets, len(_event_timestamp))))
+        event_timestamp = np.concatenate(event_timestamp) if len(event_timestamp)>0 else np.empty(0)
+        trial_size      = np.concatenate(trial_size) if len(trial_size)>0 else np.empty(0, dtype=np.int64)
+        trial_offsets   = np.cumsum(trial_size) - trial_size
+        return event_timestamp, trial_offsets
+    
+    '''
+    setResponseTimeFromLog:
+        Compute response time metrics of every trial with column operations over the trial events.
+    '''
+    def setResponseTimeOnMainFromLog(self, data_log):
+        self.setResponseTimeOnMain(*self.getTrialEventsFromLog(data_log))
+    
+    '''
+    setResponseTimeOnMainFromLogStream:
+        Same as setResponseTimeOnMainFromLog, but the full log is never held in memory, only the events of each trial.
+    '''
+    def setResponseTimeOnMainFromLogStream(self, log_path, chunksize=100000):
+        self.setResponseTimeOnMain(*self.getTrialEventsFromLogStream(log_path, chunksize))
+    
+    '''
+    setResponseTimeOnMain:
+        Get an array containing the timestamps of trial events and an array of start offsets of each trial.
+        Set the response time metrics of every trial on the main dataframe.
+        The timestamps are kept as the flat arrays, and the 'timestamps' column is filled in only when
+        the output table is built (see getTrialTable).
+    '''
+    def setResponseTimeOnMain(self, event_timestamp, trial_offsets):
+        event_timestamp = np.asarray(event_timestamp, dtype=np.float64)
+        trial_offsets   = np.asarray(trial_offsets, dtype=np.int64)
+        self.event_timestamp = event_timestamp
+        self.trial_offsets   = trial_offsets
+        num_trial  = len(trial_offsets)
+        num_event  = len(event_timestamp)
+        trial_size = np.diff(np.append(trial_offsets, num_event))
+        
+        first_timestamp = event_timestamp[trial_offsets]
+        last_timestamp  = event_timestamp[trial_offsets + trial_size - 1]
+        has_action      = trial_size >= 2
+        
+        # Time differences between consecutive events of the same trial.
+        # Corner case: the last event of the very last trial is not counted for the average reaction time.
+        event_diff = np.diff(event_timestamp)
+        num_diff   = trial_size - 1
+        if num_trial > 0:
+            num_diff[-1] -= 1
+        
+        # All detailed timestamp (for logging purpose), see getTrialTable
+        self.data_main['timestamps'] = None
+        # Average reaction time per presentation from onset stimulus
+        onset_timestamp = event_timestamp[np.minimum(trial_offsets + 1, num_event - 1)]
+        self.data_main["avgOnsetRxnTime"] = np.where(has_action, onset_timestamp - first_timestamp, np.nan)
+        # Trial duration (note: if there is only one timestamp for a trial, put 0.0)
+        trial_duration = np.where(has_action, last_timestamp - first_timestamp, 0.0)
+        # Average reaction time from previous stimulus
+        # corner-case: last timestamp of the first trial - first timestamp of the first trial
+        self.data_main["avgPrevRxnTime"]  = np.concatenate([trial_duration[:1], np.diff(first_timestamp)])
+        # Average reaction(response) time of each trial (balloon)
+        # Trials with the same number of differences are averaged together as the rows of a matrix,
+        # which sums up exactly like np.mean of each trial.
+        avg_rxn_time = np.full(num_trial, np.nan)
+        for size in np.unique(num_diff[num_diff > 0]):
+            trial_idx = np.flatnonzero(num_diff == size)
+            avg_rxn_time[trial_idx] = event_diff[trial_offsets[trial_idx, None] + np.arange(size)].sum(axis=1) / size
+        self.data_main["avgRxnTime"] = avg_rxn_time
+        # Trial duration
+        self.data_main["trialDuration"] = trial_duration
+    
+    '''
+    getTrialTable:
+        Return a copy of the main dataframe with the detailed timestamps of every trial as lists in the 'timestamps' column.
+    '''
+    def getTrialTable(self):
+        data_main = self.data_main.copy()
+        if self.event_timestamp is not None:
+            data_main['timestamps'] = [i.tolist() for i in np.split(self.event_timestamp, self.trial_offsets[1:])]
+        return data_main
+    
+    '''
+    getAggregatedStats:
+        Return a dataframe of the aggregated stats (task 3 to task 9) with columns of Task, Key, and Value.
+        The stats of task 6 are computed per block of the session, i.e., `num_blocks` blocks (thirds by default)
+        or blocks of `block_size` trials, for any number of trials (see get_block_ids).
+        If `bootstrap` options are given (see bootstrap.py), the bounds of the bootstrap interval of the averages (task 3, 7, 8 and 9)
+        are added as CI_Low and CI_High (NaN for the other stats).
+    '''
+    def getAggregatedStats(self, num_blocks=3, block_size=None, bootstrap=None):
+        data_main = self.data_main
+        # This list will collect all computed data
+        aggregate_data = []
+        # (Task, Key) -> (CI_Low, CI_High) of the averages
+        intervals = {}
+        
+        # Task 3: points on balloons by color (condition)
+        prefix = "balloonscore_per_color"
+        for key,value in data_main.groupby('imgroot')['balloonscore'].mean().to_dict().items():
+            _data = (prefix, key, value)
+            aggregate_data.append(_data)
+        if bootstrap is not None:
+            intervals.update(get_interval_rows(prefix, bootstrap_grouped_ci(data_main.groupby('imgroot')['balloonscore'], **bootstrap)))
+        
+        # Task 4: number of points for each participant
+        total_balloonscore = np.sum(data_main['balloonscore'].values)
+        prefix = "balloonscore_pop"
+        _data = (prefix, "total_balloonscore", total_balloonscore)
+        aggregate_data.append(_data)
+        
+        # Task 5: number of pops per participant*
+        total_pops = len(np.argwhere(data_main['balloonscore'].values==0))
+        _data = (prefix, "total_pops", total_pops)
+        aggregate_data.append(_data)
+        
+        # Task 6: number of pops and number of points per color condition for each block of the session (thirds by default)*
+        data_len = len(data_main)
+        if block_size is None and data_len % num_blocks != 0:
+            print("[WARN] The number of trials is not divisible by {} ({}/{}). The last block takes the remaining trials.".format(num_blocks, data_len, num_blocks))
+        block_id  = get_block_ids(np.arange(data_len), data_len, num_blocks, block_size)
+        num_block = num_blocks if block_size is None else -(-data_len // block_size)
+        points_and_pops = sum_points_and_pops(data_main['balloonscore'].values, data_main['imgroot'].values, [block_id])
+        # An empty block or color sums up to zero (of the type of the scores)
+        zero_score = data_main['balloonscore'].values.dtype.type(0)
+        for block in range(num_block):
+            prefix = "balloonscore_pop_per_color_" + get_block_name(block, num_blocks, block_size)
+            for imgroot, color in BALLOON_COLORS:
+                is_found = (block, imgroot) in points_and_pops.index
+                aggregate_data.append((prefix, color+"_score", points_and_pops.at[(block, imgroot), 'score'] if is_found else zero_score))
+                aggregate_data.append((prefix, color+"_pops",  points_and_pops.at[(block, imgroot), 'pops'] if is_found else 0))
+        
+        # Task 7: average reaction time after popped balloons*
+        avg_rxntime_after_popped = np.nan
+        popped_balloons_trial_idx = np.flatnonzero(data_main['balloonscore'].values==0)
+        if(len(popped_balloons_trial_idx)<1):
+            print("[WARN] No popped balloons")
+        else:
+            popped_balloons_trial_idx += 1 # increase index to target the AFTER popped
+            # The last balloon is popped. In this case, there is no more following trial to compute, thus we ignore the last pop.
+            if(popped_balloons_trial_idx[-1]==len(data_main)):
+                print("[WARN] A balloon is poppped at the last trial. Thus, the corresponding reaction time is not reflected to the calculation.")
+                popped_balloons_trial_idx = popped_balloons_trial_idx[:-1]
+            avg_rxntime_after_popped = data_main.iloc[popped_balloons_trial_idx]['avgRxnTime'].mean()
+        prefix = "avg_rxntime_after_popped"
+        _data = (prefix, "avg_rxntime_after_popped", avg_rxntime_after_popped)
+        aggregate_data.append(_data)
+        if bootstrap is not None:
+            rxntime_after_popped = data_main['avgRxnTime'].values[popped_balloons_trial_idx]
+            intervals.update(get_interval_rows(prefix, bootstrap_ci([("avg_rxntime_after_popped", rxntime_after_popped)], **bootstrap)))
+        
+        # Task 8: average reaction time by color
+        prefix = "avg_rxntime_by_color"
+        for key,value in data_main.groupby('imgroot')['avgRxnTime'].mean().to_dict().items():
+            _data = (prefix, key, value)
+            aggregate_data.append(_data)
+        if bootstrap is not None:
+            intervals.update(get_interval_rows(prefix, bootstrap_grouped_ci(data_main.groupby('imgroot')['avgRxnTime'], **bootstrap)))
+        
+        # Task 9: split blue balloons into load sizes (there are three) with average reaction time for each
+        prefix = "avg_rxntime_by_loadsize"
+        for key,value in data_main[data_main['imgroot']=='blueballoon'].groupby('maxpumps')['avgRxnTime'].mean().to_dict().items():
+            _data = (prefix, key, value)
+            aggregate_data.append(_data)
+        if bootstrap is None:
+            return pd.DataFrame(aggregate_data, columns=['Task','Key','Value'])
+        intervals.update(get_interval_rows(prefix, bootstrap_grouped_ci(data_main[data_main['imgroot']=='blueballoon'].groupby('maxpumps')['avgRxnTime'], **bootstrap)))
+        aggregate_data = [_data + intervals.get(_data[:2], (np.nan, np.nan)) for _data in aggregate_data]
+        return pd.DataFrame(aggregate_data, columns=['Task','Key','Value','CI_Low','CI_High'])
+    
+    '''
+    getPostExplosionBehavior:
+        Return a dataframe of every popped case, and the right after of the same condition (task 10).
+        1. Find the exploded case
+        2.1 Ignore the exploded case at the last trial
+        2.2 Ignore the explosion right after the explosion (it is collected as an exploded case)
+        2.3 Make sure the post behavior is for the same condition
+    '''
+    def getPostExplosionBehavior(self, data_main=None):
+        if data_main is None:
+            data_main = self.getTrialTable()
+        return get_post_event_window(data_main, lambda data: data['balloonscore']==0, window=1)
+    
+    '''
+    getResults:
+        Return a dictionary of the output dataframes (see getAggregatedStats for `num_blocks`, `block_size` and `bootstrap`).
+    '''
+    def getResults(self, num_blocks=3, block_size=None, bootstrap=None):
+        data_main = self.getTrialTable()
+        # Task 1: response time per presentation from onset stimulus
+        # Task 2: response time from previous stimulus
+        return {'rxntime_from_onset_from_previous': data_main,
+                # Stats from task 3 to task 9 will be aggregated
+                'aggregated_stats'                : self.getAggregatedStats(num_blocks, block_size, bootstrap),
+                # Task 10: post_explosion_behavior - Collect every popped case, and the right after the same condition.
+                'post_explosion_behavior'         : self.getPostExplosionBehavior(data_main)}
+
+
+'''
+Class BELT_LogFollower:
+    Follow the .log file of a session that is still running (i.e., PsychoPy is still appending to it),
+    and keep the parser state between reads so that every log line is parsed only once.
+    Each log line is classified the same way as BELT_Analyzer.classifyLogEvents, and the running metrics are
+    updated in O(1) per event: the response time metrics of a trial are final when the next "New trial" arrives,
+    and the points and pops per color are counted from "Score: N" and "Popped".
+    The events of every trial are kept as well, so that the end-of-session output is computed without parsing
+    the log again (see getTrialEvents).
+    If `on_trial` is given, it is called with the live metrics of every trial and the follower as soon as the trial is completed.
+'''
+class BELT_LogFollower:
+    def __init__(self, log_path, on_trial=None):
+        self.log_path = log_path
+        self.on_trial = on_trial
+        self.reset()
+    
+    '''
+    reset:
+        Forget everything read so far, i.e., follow the log file from the beginning.
+    '''
+    def reset(self):
+        # Bytes of the log file consumed so far, and the last line if it is not complete yet
+        self.offset  = 0
+        self.partial = b''
+        # Events of the completed and the open trials, the same as BELT_Analyzer.getTrialEventsFromLog
+        self.event_timestamp = []
+        self.trial_offsets   = []
+        # Live metrics of every completed trial (see closeTrial)
+        self.trials = []
+        self.color_stats = {imgroot: {'score': 0, 'pops': 0} for imgroot, _ in BALLOON_COLORS}
+        self.trial = None
+        self.prev_first_timestamp = None
+    
+    '''
+    update:
+        Read the lines appended to the log file since the last call, and return a list of the live metrics of
+        the trials completed by them. Nothing is read until the log file is created.
+        If the log file shrinks (i.e., it is replaced by another session), it is followed from the beginning.
+    '''
+    def update(self):
+        if not os.path.isfile(self.log_path):
+            return []
+        if os.path.getsize(self.log_path) < self.offset:
+            print("[WARN] {} is truncated. Following it from the beginning.".format(self.log_path))
+            self.reset()
+        with open(self.log_path, mode='rb') as f:
+            f.seek(self.offset)
+            data = f.read()
+        self.offset += len(data)
+        lines = (self.partial + data).split(b'\n')
+        self.partial = lines.pop()
+        num_trials = len(self.trials)
+        for line in lines:
+            self.addLine(line.decode('UTF-8', errors='replace'))
+        return self.trials[num_trials:]
+    
+    '''
+    finish:
+        Parse the last line even if it does not end with a newline, and close the open trial.
+        Return a list of the live metrics of the trials completed by them.
+    '''
+    def finish(self):
+        num_trials = len(self.trials)
+        if len(self.partial) > 0:
+            self.addLine(self.partial.decode('UTF-8', errors='replace'))
+            self.partial = b''
+        if self.trial is not None:
+            self.closeTrial(is_last=True)
+        return self.trials[num_trials:]
+    
+    '''
+    addLine:
+        Parse a single tab-separated log line, and update the state of the open trial.
+        Lines without a numeric timestamp or a message are skipped, the same as BELT_Analyzer.parseLog.
+    '''
+    def addLine(self, line):
+        fields = line.split('\t', 2)
+        if len(fields) < 3:
+            return
+        try:
+            timestamp = float(fields[0])
+        except ValueError:
+            return
+        msg = fields[2].rstrip()
+        is_new_trial = msg.startswith('New trial')
+        is_trial_end = 'Popped' in msg or 'Score' in msg
+        is_keypress  = (not is_trial_end) and (msg.startswith('Keypress: space') or msg.startswith('Keypress: return'))
+        if is_new_trial:
+            if self.trial is not None:
+                self.closeTrial()
+            imgroot = re.search(r"'imgroot', '([^']*)'", msg)
+            self.trial_offsets.append(len(self.event_timestamp))
+            self.event_timestamp.append(timestamp)
+            self.trial = {'imgroot'        : imgroot.group(1) if imgroot is not None else None,
+                          'first_timestamp': timestamp,
+                          'last_timestamp' : timestamp,
+                          'onset_timestamp': None,
+                          'num_event'      : 1,
+                          'sum_diff'       : 0.0,
+                          'last_diff'      : 0.0,
+                          'balloonscore'   : None,
+                          'is_ended'       : False}
+        if self.trial is None or self.trial['is_ended']:
+            return
+        if is_keypress:
+            trial = self.trial
+            self.event_timestamp.append(timestamp)
+            trial['last_diff'] = timestamp - trial['last_timestamp']
+            trial['sum_diff'] += trial['last_diff']
+            trial['last_timestamp'] = timestamp
+            if trial['onset_timestamp'] is None:
+                trial['onset_timestamp'] = timestamp
+            trial['num_event'] += 1
+        if is_trial_end:
+            self.trial['is_ended'] = True
+            score = re.search(r'Score:\s*(-?[0-9.]+)', msg)
+            if 'Popped' in msg:
+                self.trial['balloonscore'] = 0
+            elif score is not None:
+                self.trial['balloonscore'] = float(score.group(1))
+            stats = self.color_stats.setdefault(self.trial['imgroot'], {'score': 0, 'pops': 0})
+            if self.trial['balloonscore'] is not None:
+                stats['score'] += self.trial['balloonscore']
+                stats['pops']  += int(self.trial['balloonscore'] == 0)
+    
+    '''
+    closeTrial:
+        Compute the response time metrics of the open trial (see BELT_Analyzer.setResponseTimeOnMain) and append them to the trials.
+        Corner case: the last event of the very last trial is not counted for the average reaction time.
+    '''
+    def closeTrial(self, is_last=False):
+        trial = self.trial
+        has_action = trial['num_event'] >= 2
+        num_diff   = trial['num_event'] - 1 - int(is_last)
+        sum_diff   = trial['sum_diff'] - (trial['last_diff'] if is_last else 0.0)
+        duration   = trial['last_timestamp'] - trial['first_timestamp'] if has_action else 0.0
+        metrics = {'trial'          : len(self.trials),
+                   'imgroot'        : trial['imgroot'],
+                   'balloonscore'   : trial['balloonscore'],
+                   'avgOnsetRxnTime': trial['onset_timestamp'] - trial['first_timestamp'] if has_action else np.nan,
+                   'avgPrevRxnTime' : trial['first_timestamp'] - self.prev_first_timestamp if self.prev_first_timestamp is not None else duration,
+                   'avgRxnTime'     : sum_diff / num_diff if num_diff > 0 else np.nan,
+                   'trialDuration'  : duration}
+        self.trials.append(metrics)
+        self.prev_first_timestamp = trial['first_timestamp']
+        self.trial = None
+        if self.on_trial is not None:
+            self.on_trial(metrics, self)
+        return metrics
+    
+    '''
+    getTrialEvents:
+        Return the timestamps of the trial events and the start offsets of each trial read so far,
+        i.e., the same as BELT_Analyzer.getTrialEventsFromLog of the full log (see BELT_Analyzer.setResponseTimeOnMain).
+    '''
+    def getTrialEvents(self):
+        return np.array(self.event_timestamp, dtype=np.float64), np.array(self.trial_offsets, dtype=np.int64)
+
+
+'''
+get_post_event_window:
+    Get a dataframe of trials and an event predicate (a function of the dataframe or a boolean array, e.g., popped balloons).
+    Return every event trial followed by the next `window` trials of the same condition (e.g., the same balloon color),
+    sorted by condition and trial order. A window stops early at the next event, which opens its own window.
+    The original trial order is kept in the 'local_index' column, and the distance from the event is stored
+    in `offset_column` if it is given.
+    e.g.) condition <- [blue, blue, blue, blue, pink, pink, NaN, NaN]
+          is_event  <- [T,    F,    F,    T,    F,    T,    T,   F  ]
+          window=1 -> trials [0, 1, 3, 5, 6]
+          window=2 -> trials [0, 1, 2, 3, 5, 6]
+'''
+def get_post_event_window(data_main, event, window=1, condition='imgroot', offset_column=None):
+    is_event = pd.Series(np.asarray(event(data_main) if callable(event) else event, dtype=bool), index=data_main.index)
+    data = data_main.copy()
+    data['local_index'] = data.index
+    data = data.sort_values(by=[condition,'local_index'])
+    is_event = is_event[data.index].values
+    data = data.reset_index(drop=True)
+    
+    # Position of the latest event of the same condition, then the distance of every trial from it.
+    # An event is always in its own window, even without a condition (NaN keys are left out of the groups),
+    # but no trial follows an event of a missing condition.
+    position = np.arange(len(data), dtype=np.float64)
+    last_event_position = pd.Series(np.where(is_event, position, np.nan)).groupby(data[condition].values).ffill().values
+    last_event_position = np.where(is_event, position, last_event_position)
+    event_offset = position - last_event_position
+    is_in_window = event_offset <= window
+    
+    data_window = data[is_in_window].reset_index(drop=True)
+    if offset_column is not None:
+        data_window[offset_column] = event_offset[is_in_window].astype(int)
+    return data_window
+
+
+'''
+get_block_ids:
+    Get the position of every trial within its session and the number of trials of the session (scalars or arrays).
+    Return the block id of every trial, i.e., the session is split into `num_blocks` blocks of num_trials//num_blocks trials
+    where the last block takes the remaining trials, or into blocks of `block_size` trials if it is given.
+    e.g.) num_trials=8, num_blocks=3 -> [0,0,1,1,2,2,2,2]
+          num_trials=8, block_size=3 -> [0,0,0,1,1,1,2,2]
+'''
+def get_block_ids(trial_pos, num_trials, num_blocks=3, block_size=None):
+    trial_pos = np.asarray(trial_pos)
+    if block_size is not None:
+        return trial_pos // block_size
+    size = np.asarray(num_trials) // num_blocks
+    # Corner case: with fewer trials than blocks, every trial belongs to the last block
+    return np.where(size > 0, np.minimum(trial_pos // np.maximum(size, 1), num_blocks-1), num_blocks-1)
+
+'''
+get_block_name:
+    Return the name of a block in the aggregated stats, i.e., first_third, second_third and last_third
+    for the thirds of a session, and block1, block2, ... otherwise.
+'''
+def get_block_name(block, num_blocks=3, block_size=None):
+    if block_size is None and num_blocks == len(SESSION_THIRDS):
+        return SESSION_THIRDS[block]
+    return "block{}".format(block+1)
+
+'''
+sum_points_and_pops:
+    Get the balloon scores and colors of the trials, and a list of group keys of the trials (e.g., [block ids]).
+    Return a dataframe of the points ('score') and the number of pops ('pops') per (group keys..., color), with a single groupby.
+    The points of a group are NaN if any of its scores is NaN, the same as np.sum.
+'''
+def sum_points_and_pops(balloonscore, imgroot, keys):
+    is_nan = pd.isna(balloonscore)
+    data = pd.DataFrame({'score': balloonscore, 'pops': (balloonscore==0).astype(int), 'nan': is_nan.astype(int)})
+    points_and_pops = data.groupby(list(keys) + [imgroot]).sum()
+    if is_nan.any():
+        points_and_pops.loc[points_and_pops['nan'] > 0, 'score'] = np.nan
+    return points_and_pops[['score', 'pops']]
+
+'''
+get_interval_rows:
+    Get the prefix (Task) of a stat and the bootstrap intervals of its averages (see bootstrap.bootstrap_ci).
+    Return a dictionary of (Task, Key) -> (CI_Low, CI_High) of the aggregated stats.
+'''
+def get_interval_rows(prefix, data_ci):
+    return {(prefix, key): (ci_low, ci_high) for key, ci_low, ci_high in zip(data_ci.index, data_ci['ci_low'], data_ci['ci_high'])}
+
+
+'''
+analyze_belt:
+    Get the main dataframe (e.g., PARTICIPANTID_BELT_TEST_YYYY_MMM_DD_XXXX.csv) and the log dataframe (see BELT_Analyzer.readLog or readLogEvents).
+    Return a dictionary of the output dataframes (see BELT_Analyzer.getAggregatedStats for `num_blocks`, `block_size` and `bootstrap`).
+'''
+def analyze_belt(data_main, data_log, num_blocks=3, block_size=None, bootstrap=None):
+    with instrument_stage('belt', 'parse') as record:
+        my_BELT = BELT_Analyzer(data_main, data_log)
+        record['rows'] = len(data_log)
+    with instrument_stage('belt', 'aggregate') as record:
+        results = my_BELT.getResults(num_blocks, block_size, bootstrap)
+        record['rows'] = len(data_main)
+    return results
+
+'''
+analyze_belt_stream:
+    Same as analyze_belt, but read the log file trial-by-trial instead of holding the full log in memory.
+'''
+def analyze_belt_stream(data_main, log_path, log_chunksize=100000, num_blocks=3, block_size=None, bootstrap=None):
+    with instrument_stage('belt', 'parse') as record:
+        my_BELT = BELT_Analyzer(data_main)
+        my_BELT.setResponseTimeOnMainFromLogStream(log_path, log_chunksize)
+        record['rows'] = len(data_main)
+    with instrument_stage('belt', 'aggregate') as record:
+        results = my_BELT.getResults(num_blocks, block_size, bootstrap)
+        record['rows'] = len(data_main)
+    return results
+
+'''
+save_belt:
+    Save the output dataframes as <SUBJECTID>_<output>.csv (or with the given output backend) under out_dir.
+    `session_id` names the part of the session in the dataset backend (see output.get_session_ids).
+    Return a list of the saved paths.
+'''
+def save_belt(results, subject_id, out_dir='.', backend='csv', session_id=None):
+    save_paths = []
+    for name, index in [('rxntime_from_onset_from_previous', True), ('aggregated_stats', False), ('post_explosion_behavior', False)]:
+        save_path = save_output(results[name], out_dir, subject_id+"_"+name, backend, index, 'belt', name, subject_id, session_id)
+        print("[INFO] Output is saved at {}".format(save_path))
+        save_paths.append(save_path)
+    return save_paths
+
+'''
+run_belt:
+    Read, analyze and save a single session.
+    If `log_cache_dir` is given, the parsed log is cached there and memory-mapped on later runs (see BELT_Analyzer.readLogCached).
+'''
+def run_belt(csv_path, log_path, out_dir='.', stream_log=False, log_chunksize=100000, backend='csv', log_cache_dir=None, log_cache_max_bytes=None,
+             num_blocks=3, block_size=None, bootstrap=None):
+    print("[INFO] Processing {}...".format(csv_path))
+    subject_id, session_id = get_session_ids(csv_path)
+    with instrument_stage('belt', 'load') as record:
+        data_main = pd.read_csv(csv_path)
+        record['rows'] = len(data_main)
+    if stream_log:
+        results = analyze_belt_stream(data_main, log_path, log_chunksize, num_blocks, block_size, bootstrap)
+    else:
+        with instrument_stage('belt', 'load_log') as record:
+            if log_cache_dir is not None:
+                data_log = BELT_Analyzer.readLogCached(log_path, log_cache_dir, log_cache_max_bytes)
+            else:
+                data_log = BELT_Analyzer.readLogEvents(log_path)
+            record['rows'] = len(data_log)
+        results = analyze_belt(data_main, data_log, num_blocks, block_size, bootstrap)
+    with instrument_stage('belt', 'write'):
+        return save_belt(results, subject_id, out_dir, backend, session_id)
+
+
+'''
+follow_belt:
+    Follow the .log file of a running session (see BELT_LogFollower), checking for new lines every `poll_interval` seconds,
+    and call `on_trial` with the live metrics of every completed trial and the follower.
+    Stop when the log file has not grown for `idle_timeout` seconds (or on Ctrl+C), and return the follower.
+'''
+def follow_belt(log_path, poll_interval=1.0, idle_timeout=60.0, on_trial=None):
+    follower = BELT_LogFollower(log_path, on_trial)
+    last_growth = time.monotonic()
+    try:
+        while True:
+            offset = follower.offset
+            follower.update()
+            if follower.offset != offset:
+                last_growth = time.monotonic()
+            elif time.monotonic() - last_growth >= idle_timeout:
+                break
+            time.sleep(poll_interval)
+    except KeyboardInterrupt:
+        print("[INFO] Stopped following {}.".format(log_path))
+    follower.finish()
+    return follower
+
+'''
+print_live_trial:
+    Print the live metrics of a completed trial and the running points and pops per color (see follow_belt).
+'''
+def print_live_trial(metrics, follower):
+    color_stats = ', '.join("{} {:g} points/{} pops".format(color, follower.color_stats[imgroot]['score'], follower.color_stats[imgroot]['pops'])
+                            for imgroot, color in BALLOON_COLORS)
+    print("[INFO] Trial {} ({}): onset {:.3f}s, avg {:.3f}s, duration {:.3f}s | {}".format(
+          metrics['trial']+1, metrics['imgroot'], metrics['avgOnsetRxnTime'], metrics['avgRxnTime'], metrics['trialDuration'], color_stats))
+
+'''
+run_belt_follow:
+    Same as run_belt, but follow the .log file while the session is still running (see follow_belt) and print the metrics
+    of every trial as soon as it is completed. Once the session ends, the CSV file is read and the outputs are saved
+    from the trial events collected while following, without parsing the log again.
+'''
+def run_belt_follow(csv_path, log_path, out_dir='.', backend='csv', poll_interval=1.0, idle_timeout=60.0, num_blocks=3, block_size=None, bootstrap=None):
+    print("[INFO] Following {}...".format(log_path))
+    with instrument_stage('belt', 'parse') as record:
+        follower = follow_belt(log_path, poll_interval, idle_timeout, print_live_trial)
+        record['rows'] = len(follower.trials)
+    print("[INFO] Processing {}...".format(csv_path))
+    subject_id, session_id = get_session_ids(csv_path)
+    with instrument_stage('belt', 'load') as record:
+        data_main = pd.read_csv(csv_path)
+        record['rows'] = len(data_main)
+    with instrument_stage('belt', 'aggregate') as record:
+        my_BELT = BELT_Analyzer(data_main)
+        my_BELT.setResponseTimeOnMain(*follower.getTrialEvents())
+        results = my_BELT.getResults(num_blocks, block_size, bootstrap)
+        record['rows'] = len(data_main)
+    with instrument_stage('belt', 'write'):
+        return save_belt(results, subject_id, out_dir, backend, session_id)
+
+
+'''
+aggregate_belt_cohort:
+    Get a dataframe of the trials of every subject of a cohort, i.e., the main dataframes with the response time
+    metrics (see BELT_Analyzer.setResponseTimeOnMain) concatenated with a `subject_column` column.
+    Return a wide dataframe of the aggregated stats (task 3 to task 9), one row per subject (in the order of appearance)
+    and one column per "<Task>.<Key>" of getAggregatedStats, computed with a few grouped operations over the whole cohort.
+    The blocks of task 6 are split the same way as getAggregatedStats for any number of trials, and a key missing for a subject
+    (e.g., no blue balloons, or a block beyond the trials of the subject with `block_size`) is NaN.
+'''
+def aggregate_belt_cohort(data_cohort, subject_column='subject_id', num_blocks=3, block_size=None):
+    data = data_cohort.reset_index(drop=True)
+    subject_id = data[subject_column].values
+    subjects   = pd.unique(subject_id)
+    is_pop     = data['balloonscore'].values == 0
+    aggregate_data = []
+    
+    # Task 3: points on balloons by color (condition)
+    aggregate_data.append(('balloonscore_per_color', data.groupby([subject_column,'imgroot'])['balloonscore'].mean().unstack('imgroot')))
+    
+    # Task 4 and 5: number of points and number of pops for each participant
+    aggregate_data.append(('balloonscore_pop', pd.DataFrame({'total_balloonscore': data.groupby(subject_column, sort=False)['balloonscore'].sum(),
+                                                             'total_pops'        : pd.Series(is_pop).groupby(subject_id, sort=False).sum()})))
+    
+    # Task 6: number of pops and number of points per color condition for each block of the session (thirds by default)
+    trial_pos  = data.groupby(subject_column, sort=False).cumcount().values
+    num_trials = data.groupby(subject_column, sort=False)[subject_column].transform('size').values
+    block_id   = get_block_ids(trial_pos, num_trials, num_blocks, block_size)
+    points_and_pops = sum_points_and_pops(data['balloonscore'].values, data['imgroot'].values, [subject_id, block_id]).unstack([1, 2], fill_value=0)
+    if block_size is None:
+        num_block = num_blocks
+    else:
+        # Blocks of k trials: a subject with fewer trials has fewer blocks, and the missing blocks are NaN
+        num_block = int(block_id.max()) + 1 if len(block_id) > 0 else 0
+        subject_num_block = -(-pd.Series(num_trials).groupby(subject_id, sort=False).first() // block_size)
+        subject_num_block = subject_num_block.reindex(points_and_pops.index).values
+    for block in range(num_block):
+        columns = {}
+        for imgroot, color in BALLOON_COLORS:
+            for metric in ['score', 'pops']:
+                key = (metric, block, imgroot)
+                columns[color+'_'+metric] = points_and_pops[key] if key in points_and_pops.columns else 0
+        data_block = pd.DataFrame(columns, index=points_and_pops.index)
+        if block_size is not None:
+            data_block = data_block.where(pd.Series(block < subject_num_block, index=data_block.index), axis=0)
+        aggregate_data.append(('balloonscore_pop_per_color_'+get_block_name(block, num_blocks, block_size), data_block))
+    
+    # Task 7: average reaction time after popped balloons (the trial right after a pop of the same subject)
+    is_after_pop = np.zeros(len(data), dtype=bool)
+    is_after_pop[1:] = is_pop[:-1] & (subject_id[1:] == subject_id[:-1])
+    rxntime_after_pop = data['avgRxnTime'].values[is_after_pop].astype(np.float64)
+    subject_after_pop = subject_id[is_after_pop]
+    # Trials of a subject are contiguous. Each subject is summed over its own slice, the same way as Series.mean
+    # (a segmented sum such as np.add.reduceat may differ in the last digit).
+    group_bounds = np.flatnonzero(np.r_[True, subject_after_pop[1:] != subject_after_pop[:-1], True]) if len(subject_after_pop) > 0 else np.zeros(1, dtype=int)
+    is_valid     = ~np.isnan(rxntime_after_pop)
+    rxntime_after_pop[~is_valid] = 0.0
+    avg_rxntime_after_popped = pd.Series([rxntime_after_pop[start:end].sum()/is_valid[start:end].sum() if is_valid[start:end].any() else np.nan
+                                          for start, end in zip(group_bounds[:-1], group_bounds[1:])],
+                                         index=subject_after_pop[group_bounds[:-1]], dtype=np.float64)
+    aggregate_data.append(('avg_rxntime_after_popped', pd.DataFrame({'avg_rxntime_after_popped': avg_rxntime_after_popped})))
+    
+    # Task 8: average reaction time by color
+    aggregate_data.append(('avg_rxntime_by_color', data.groupby([subject_column,'imgroot'])['avgRxnTime'].mean().unstack('imgroot')))
+    
+    # Task 9: split blue balloons into load sizes with average reaction time for each
+    data_blue = data[data['imgroot']=='blueballoon']
+    aggregate_data.append(('avg_rxntime_by_loadsize', data_blue.groupby([subject_column,'maxpumps'])['avgRxnTime'].mean().unstack('maxpumps')))
+    
+    data_out = pd.concat([df.reindex(subjects).rename(columns=lambda key: "{}.{}".format(prefix, key))
+                          for prefix, df in aggregate_data], axis=1)
+    data_out.index.name = subject_column
+    return data_out
+
+'''
+analyze_belt_cohort:
+    Get an iterable of (subject_id, main dataframe, log dataframe) of every subject of a cohort.
+    Return a wide dataframe of the aggregated stats of every subject (see aggregate_belt_cohort).
+'''
+def analyze_belt_cohort(sessions, num_blocks=3, block_size=None):
+    data_trials = []
+    for subject_id, data_main, data_log in sessions:
+        my_BELT = BELT_Analyzer(data_main, data_log)
+        data_trials.append(my_BELT.data_main.assign(subject_id=subject_id))
+    return aggregate_belt_cohort(pd.concat(data_trials, ignore_index=True), num_blocks=num_blocks, block_size=block_size)
+
+'''
+run_belt_cohort:
+    Read and analyze every session of a cohort, given as a list of (csv_path, log_path),
+    and save the aggregated stats as BELT_cohort_aggregated_stats.csv (or with the given output backend) under out_dir.
+    Sessions are labeled with the subject id of their filename, or with the full filename if a subject has several sessions.
+    If `log_cache_dir` is given, the parsed logs are cached there and memory-mapped on later runs (see BELT_Analyzer.readLogCached).
+    If `bootstrap` options are given (see bootstrap.py), the mean of every stat over the cohort and its bootstrap interval
+    (resampling the subjects) are saved as BELT_cohort_bootstrap_ci.csv as well (see bootstrap.bootstrap_cohort_ci).
+    Return a list of the saved paths.
+'''
+def run_belt_cohort(session_paths, out_dir='.', backend='csv', log_cache_dir=None, log_cache_max_bytes=None, num_blocks=3, block_size=None,
+                    bootstrap=None):
+    subject_ids = [get_session_ids(csv_path)[0] for csv_path, _ in session_paths]
+    if len(set(subject_ids)) < len(subject_ids):
+        print("[WARN] Some subjects have several sessions. Sessions are labeled with their filename.")
+        subject_ids = [get_session_ids(csv_path)[1] for csv_path, _ in session_paths]
+    def iterSessions():
+        for subject_id, (csv_path, log_path) in zip(subject_ids, session_paths):
+            print("[INFO] Processing {}...".format(csv_path))
+            if log_cache_dir is not None:
+                data_log = BELT_Analyzer.readLogCached(log_path, log_cache_dir, log_cache_max_bytes)
+            else:
+                data_log = BELT_Analyzer.readLogEvents(log_path)
+            yield subject_id, pd.read_csv(csv_path), data_log
+    data_out  = analyze_belt_cohort(iterSessions(), num_blocks, block_size)
+    save_paths = [save_output(data_out, out_dir, 'BELT_cohort_aggregated_stats', backend, True, 'belt', 'cohort_aggregated_stats', 'cohort')]
+    if bootstrap is not None:
+        data_ci = bootstrap_cohort_ci(data_out, **bootstrap)
+        save_paths.append(save_output(data_ci, out_dir, 'BELT_cohort_bootstrap_ci', backend, True, 'belt', 'cohort_bootstrap_ci', 'cohort'))
+    for save_path in save_paths:
+        print("[INFO] Output is saved at {}".format(save_path))
+    return save_paths
@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+
+'''
+Bootstrap options:
+    Keyword arguments of bootstrap_ci (and of the functions below), passed as a dictionary (e.g., `bootstrap` of nctlab.run_nback).
+    - num_resamples: the number of bootstrap resamples (default: 1000)
+    - confidence   : the confidence level of the percentile interval (default: 0.95)
+    - seed         : the seed of the random generator, so that the same inputs always give the same intervals (default: 0)
+    - chunk_size   : the number of resamples drawn at once, which bounds the memory to chunk_size x (number of values)
+                     indices (default: every resample at once). The intervals do not depend on it.
+'''
+DEFAULT_NUM_RESAMPLES = 1000
+DEFAULT_CONFIDENCE    = 0.95
+
+'''
+resample_means:
+    Get the values of a group (without NaN) and a random generator.
+    Return the means of `num_resamples` resamples with replacement, drawn as a single (num_resamples, n) index matrix,
+    or `chunk_size` rows of it at a time.
+    Each index is drawn from a single uniform number, so that the resamples are the same for any chunk_size.
+'''
+def resample_means(values, rng, num_resamples=DEFAULT_NUM_RESAMPLES, chunk_size=None):
+    n = len(values)
+    chunk_size = chunk_size or num_resamples
+    means = np.empty(num_resamples, dtype=np.float64)
+    for start in range(0, num_resamples, chunk_size):
+        stop = min(start + chunk_size, num_resamples)
+        indices = (rng.random((stop - start, n)) * n).astype(np.intp)
+        means[start:stop] = values[indices].mean(axis=1)
+    return means
+
+'''
+bootstrap_ci:
+    Get an iterable of (key, values) of the groups (e.g., the conditions of a subject).
+    Return a dataframe of the percentile bootstrap interval of the mean of each group, with columns of ci_low and ci_high,
+    indexed by the keys (a MultiIndex if the keys are tuples). NaN values are dropped, and a group without values is NaN.
+    Each group has its own random stream spawned from `seed`, in the order of the groups.
+'''
+def bootstrap_ci(groups, num_resamples=DEFAULT_NUM_RESAMPLES, confidence=DEFAULT_CONFIDENCE, seed=0, chunk_size=None):
+    groups = list(groups)
+    percentiles = [50*(1-confidence), 50*(1+confidence)]
+    seeds = np.random.SeedSequence(seed).spawn(len(groups))
+    bounds = np.full((len(groups), 2), np.nan)
+    for i, (_, values) in enumerate(groups):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            continue
+        means = resample_means(values, np.random.default_rng(seeds[i]), num_resamples, chunk_size)
+        bounds[i] = np.percentile(means, percentiles)
+    keys = [key for key, _ in groups]
+    index = pd.MultiIndex.from_tuples(keys) if len(keys) > 0 and isinstance(keys[0], tuple) else pd.Index(keys)
+    return pd.DataFrame(bounds, index=index, columns=['ci_low', 'ci_high'])
+
+'''
+bootstrap_grouped_ci:
+    Same as bootstrap_ci, but get a grouped column (e.g., data.groupby('condition')['rxn_time']) instead of the groups.
+'''
+def bootstrap_grouped_ci(grouped, **options):
+    return bootstrap_ci(((key, column.values) for key, column in grouped), **options)
+
+'''
+bootstrap_cohort_ci:
+    Get a table of a cohort with one row per subject (e.g., the wide aggregated stats of aggregate_belt_cohort).
+    Return a dataframe with one row per column of the table (of `columns`, default: every numeric column), i.e.,
+    the number of subjects with a value, the mean over the subjects, and the bootstrap interval of that mean,
+    where the subjects are resampled (see bootstrap_ci).
+'''
+def bootstrap_cohort_ci(data_cohort, columns=None, **options):
+    if columns is None:
+        columns = list(data_cohort.select_dtypes(include='number').columns)
+    data_ci = bootstrap_ci(((column, data_cohort[column].values) for column in columns), **options)
+    data_out = pd.DataFrame({'num_subjects': [int(data_cohort[column].notna().sum()) for column in columns],
+                             'mean'        : [data_cohort[column].mean() for column in columns]}, index=pd.Index(columns, name='stat'))
+    return pd.concat([data_out, data_ci.set_axis(data_out.index)], axis=1)
@@ -0,0 +1,188 @@
+import os
+import time
+
+'''
+cli:
+    Command line arguments of every task, defined once and shared by the script of each task (e.g., Task3_BELT/analyze_BELT.py),
+    nct_analyze.py and the batch runner. Only the standard library is imported, so that a parser is built (and -h or
+    a wrong argument returns) before pandas is imported.
+'''
+
+# Output backends (see output.py)
+OUTPUT_BACKENDS = ['csv', 'parquet', 'feather', 'dataset']
+
+'''
+add_output_arguments:
+    Add -out_dir and -output_backend.
+'''
+def add_output_arguments(parser):
+    parser.add_argument('-out_dir', type=str, default='.',
+                       help='a path to the directory where the outputs are saved (default: current directory)')
+    parser.add_argument('-output_backend', type=str, default='csv', choices=OUTPUT_BACKENDS,
+                       help='csv (default), parquet, feather, or dataset (a partitioned Parquet dataset under out_dir)')
+
+'''
+add_log_cache_arguments / get_log_cache_max_bytes:
+    Add -log_cache_dir and -log_cache_max_mb of the parsed BELT logs (see logcache.py), and return the maximum size in bytes.
+'''
+def add_log_cache_arguments(parser):
+    parser.add_argument('-log_cache_dir', type=str, default=None,
+                       help='a path to the directory where the parsed BELT logs are cached, so that re-running the analysis skips parsing (default: disabled)')
+    parser.add_argument('-log_cache_max_mb', type=float, default=None,
+                       help='the maximum size of -log_cache_dir in MB; the least recently used caches are removed beyond it (default: unlimited)')
+
+def get_log_cache_max_bytes(args):
+    return int(args.log_cache_max_mb*2**20) if args.log_cache_max_mb is not None else None
+
+'''
+add_block_arguments / check_block_arguments:
+    Add -num_blocks and -block_size of the per-color stats of BELT, and exit with an error of the parser if they are not positive.
+'''
+def add_block_arguments(parser):
+    parser.add_argument('-num_blocks', type=int, default=3,
+                       help='the number of blocks of a session in the per-color stats, e.g., 3 for thirds or 4 for quartiles (default: 3)')
+    parser.add_argument('-block_size', type=int, default=None,
+                       help='split a session into blocks of this many trials instead of -num_blocks blocks (default: disabled)')
+
+def check_block_arguments(parser, args):
+    if args.num_blocks < 1 or (args.block_size is not None and args.block_size < 1):
+        parser.error('-num_blocks and -block_size must be positive')
+
+'''
+add_instrument_arguments / get_instrument_options:
+    Add -instrument_log, -trace_memory and -profile_dir, and return the keyword arguments of instrument.enable_instrumentation
+    (or None if -instrument_log is not given), where the records of this run are tagged with a new run id.
+'''
+def add_instrument_arguments(parser):
+    parser.add_argument('-instrument_log', type=str, default=None,
+                       help='a path to a JSON-lines log where the time of every stage of each session is appended (default: disabled)')
+    parser.add_argument('-trace_memory', action='store_true',
+                       help='record the peak memory of every stage in -instrument_log (slower)')
+    parser.add_argument('-profile_dir', type=str, default=None,
+                       help='a path to the directory where a cProfile dump of each session is written (requires -instrument_log)')
+
+def get_instrument_options(args):
+    if args.instrument_log is None:
+        return None
+    return {'log_path'    : os.path.abspath(args.instrument_log),
+            'trace_memory': args.trace_memory,
+            'profile_dir' : args.profile_dir and os.path.abspath(args.profile_dir),
+            'run_id'      : "{}-{}".format(time.strftime('%Y%m%dT%H%M%S'), os.getpid())}
+
+'''
+add_bootstrap_arguments / get_bootstrap_options:
+    Add -bootstrap, -confidence, -bootstrap_seed and -bootstrap_chunksize of the bootstrap intervals of `target`,
+    and return the bootstrap options (see bootstrap.py), or None if -bootstrap is not given.
+    Exit with an error of the parser if the options are out of range.
+'''
+def add_bootstrap_arguments(parser, target='every average'):
+    parser.add_argument('-bootstrap', type=int, default=0,
+                       help='add the bootstrap confidence interval of {}, computed from this many resamples (e.g., 1000; default: disabled)'.format(target))
+    parser.add_argument('-confidence', type=float, default=0.95,
+                       help='the confidence level of the bootstrap interval (default: 0.95)')
+    parser.add_argument('-bootstrap_seed', type=int, default=0,
+                       help='the seed of the bootstrap resamples, so that re-running gives the same intervals (default: 0)')
+    parser.add_argument('-bootstrap_chunksize', type=int, default=None,
+                       help='the number of bootstrap resamples drawn at once, to bound memory (default: every resample at once)')
+
+def get_bootstrap_options(args, parser):
+    if args.bootstrap < 0 or not 0 < args.confidence < 1 or (args.bootstrap_chunksize is not None and args.bootstrap_chunksize < 1):
+        parser.error('-bootstrap must not be negative, -confidence must be between 0 and 1, and -bootstrap_chunksize must be positive')
+    if args.bootstrap == 0:
+        return None
+    return {'num_resamples': args.bootstrap, 'confidence': args.confidence, 'seed': args.bootstrap_seed, 'chunk_size': args.bootstrap_chunksize}
+
+'''
+add_<task>_arguments:
+    Add the input arguments of each task.
+'''
+def add_nback_arguments(parser):
+    parser.add_argument('-csv_main_path', type=str, required=True,
+                       help='a path to the main CSV file (e.g., PARTICIPANTID_Nback_YYYY_MMM_DD_XXXX.csv')
+    parser.add_argument('-csv_ref_path', type=str, required=True,
+                       help='a path to the reference CSV file (e.g., nback_AB.csv')
+
+def add_facematching_arguments(parser):
+    parser.add_argument('-csv_main_path', type=str, required=True,
+                       help='a path to the main CSV file (e.g., PARTICIPANTID_FaceMatching_YYYY_MMM_DD_XXXX.csv')
+    parser.add_argument('-csv_ref_path', type=str, required=True,
+                       help='a path to the reference CSV file (e.g., facematching_AB.csv')
+
+def add_belt_arguments(parser):
+    parser.add_argument('-csv_path', type=str, required=True,
+                       help='a path to the CSV file (e.g., PARTICIPANTID_BELT_TEST_YYYY_MMM_DD_XXXX.csv')
+    parser.add_argument('-log_path', type=str, default=None,
+                       help='a path to the log file of the same subject (default: the .log file of the same name as the CSV file)')
+    parser.add_argument('-stream_log', action='store_true',
+                       help='read the log file trial-by-trial instead of holding the full log in memory')
+    parser.add_argument('-log_chunksize', type=int, default=100000,
+                       help='the number of log lines parsed at once when -stream_log is set (default: 100000)')
+    parser.add_argument('-follow', action='store_true',
+                       help='follow the log file while the session is still running, printing the metrics of every trial as soon as it is completed')
+    parser.add_argument('-poll_interval', type=float, default=1.0,
+                       help='the seconds between checks for new log lines when -follow is set (default: 1.0)')
+    parser.add_argument('-idle_timeout', type=float, default=60.0,
+                       help='stop following when the log file has not grown for this many seconds (default: 60.0)')
+    add_log_cache_arguments(parser)
+    add_block_arguments(parser)
+
+def add_banda_arguments(parser):
+    parser.add_argument('-csv_path', type=str, required=True,
+                       help='a path to the main CSV file (e.g., BANDAXXX_Scanner_ABCD_conflict_XXXX_XXX_XX_XXXX.csv')
+    parser.add_argument('-use_pyarrow', action='store_true',
+                       help='parse the CSV file with the pyarrow engine if pyarrow is installed')
+
+def add_banda_facematching_arguments(parser):
+    parser.add_argument('-csv_path', type=str, required=True,
+                       help='a path to the main CSV file (e.g., BANDAXXX_Scanner_AB_FaceMatching_XXXX_XXX_XX_XXXX.csv')
+    parser.add_argument('-use_pyarrow', action='store_true',
+                       help='parse the CSV file with the pyarrow engine if pyarrow is installed')
+
+def add_spec_arguments(parser):
+    parser.add_argument('-spec_path', type=str, required=True,
+                       help='a path to the task spec in JSON (or YAML if PyYAML is installed)')
+    parser.add_argument('-csv_path', type=str, required=True,
+                       help='a path to the main CSV file of the session')
+    parser.add_argument('-csv_ref_path', type=str, default=None,
+                       help='a path to the reference CSV file, if the spec joins one')
+
+# Task -> the function adding its input arguments
+TASK_ARGUMENTS = {'nback'             : add_nback_arguments,
+                  'facematching'      : add_facematching_arguments,
+                  'belt'              : add_belt_arguments,
+                  'banda'             : add_banda_arguments,
+                  'banda_facematching': add_banda_facematching_arguments,
+                  'spec'              : add_spec_arguments}
+
+'''
+add_task_arguments:
+    Add every argument of a single session of the task, i.e., its inputs, the output, bootstrap and instrumentation arguments.
+'''
+def add_task_arguments(parser, task):
+    TASK_ARGUMENTS[task](parser)
+    add_output_arguments(parser)
+    add_bootstrap_arguments(parser)
+    add_instrument_arguments(parser)
+
+'''
+get_subject_id:
+    Get the subject id of a session file, i.e., its filename without the extension up to the first underscore
+    (e.g., AA00LC00_BELT_TEST_2021_Jan_01_0000.csv -> AA00LC00, x.csv -> x).
+'''
+def get_subject_id(path):
+    return os.path.splitext(os.path.basename(path))[0].split('_')[0]
+
+'''
+check_belt_arguments:
+    Pair the CSV file of BELT with the .log file of the same name if -log_path is not given, and exit with an error
+    of the parser if the log file does not belong to the same subject (i.e., their filenames start with different subject ids)
+    or the blocks are not positive.
+'''
+def check_belt_arguments(parser, args):
+    if args.log_path is None:
+        args.log_path = os.path.splitext(args.csv_path)[0] + '.log'
+    csv_subject_id = get_subject_id(args.csv_path)
+    log_subject_id = get_subject_id(args.log_path)
+    if csv_subject_id != log_subject_id:
+        parser.error("-log_path: {} does not belong to the subject of {} ({} != {})".format(args.log_path, args.csv_path, log_subject_id, csv_subject_id))
+    check_block_arguments(parser, args)
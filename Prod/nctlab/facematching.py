@@ -0,0 +1,104 @@
+import os
+from .output import save_output, get_session_ids
+from .refcache import load_reference
+from .instrument import instrument_stage
+from .taskspec import compile_task_spec
+
+# Task spec of Face-matching (see taskspec)
+FACEMATCHING_SPEC = {'name'   : 'facematching',
+                     # Map the main trials to the reference by trial-1
+                     'ref'    : {'key': 'trial-1'},
+                     # Goal 1: average response time per condition (neg, neu, pos, fruit, veg)
+                     # Goal 2: average accuracy per condition
+                     'outputs': {'avg_rxntime_per_condition' : {'by': ['condition'], 'metrics': [('rxn_time', 'mean', 'rxn_time')]},
+                                 'avg_accuracy_per_condition': {'by': ['condition'], 'metrics': [('percent_accuracy', 'mean', 'percent_accuracy')]}}}
+FACEMATCHING_PLAN = compile_task_spec(FACEMATCHING_SPEC)
+
+'''
+prepare_facematching_ref:
+    Get the reference dataframe (e.g., facematching_AB.csv).
+    Return the reference dataframe indexed by the 'main_trial_id' column.
+    A reference dataframe that is already prepared is returned as it is.
+'''
+def prepare_facematching_ref(data_ref):
+    return FACEMATCHING_PLAN.prepareReference(data_ref)
+
+'''
+load_facematching_ref:
+    Read the reference CSV file (e.g., facematching_AB.csv) as a prepared reference dataframe.
+    The reference is the same for every subject, so it is preprocessed once and cached (see refcache.load_reference).
+'''
+def load_facematching_ref(csv_ref_path, cache_dir=None):
+    return load_reference(csv_ref_path, prepare_facematching_ref, 'facematching', cache_dir)
+
+'''
+analyze_facematching:
+    Get the main dataframe (e.g., PARTICIPANTID_FaceMatching_YYYY_MMM_DD_XXXX.csv) and the reference dataframe (e.g., facematching_AB.csv),
+    either as read from the CSV file or as prepared by prepare_facematching_ref/load_facematching_ref.
+    Return a dictionary of the output dataframes.
+    If `bootstrap` options are given (see bootstrap.py), every mean is followed by the bounds of its bootstrap interval.
+'''
+def analyze_facematching(data_main, data_ref, bootstrap=None):
+    # Sanity check
+    assert len(data_main) == len(data_ref), "Assertion Failure: Please make sure if the number of data in the reference CSV matches that of in the main CSV"
+
+    with instrument_stage('facematching', 'join') as record:
+        data_merge = merge_facematching(data_main, data_ref)
+        record['rows'] = len(data_merge)
+    with instrument_stage('facematching', 'aggregate') as record:
+        results = aggregate_facematching(data_merge, bootstrap)
+        record['rows'] = len(data_merge)
+    return results
+
+'''
+merge_facematching:
+    Get the main dataframe and the reference dataframe (see analyze_facematching).
+    Return the joined dataframe of every trial (of the columns used by FACEMATCHING_SPEC only).
+'''
+def merge_facematching(data_main, data_ref):
+    return FACEMATCHING_PLAN.join(data_main, data_ref)
+
+'''
+aggregate_facematching:
+    Get the joined dataframe (see merge_facematching).
+    Return a dictionary of the output dataframes (see analyze_facematching for `bootstrap`).
+'''
+def aggregate_facematching(data_merge, bootstrap=None):
+    return FACEMATCHING_PLAN.aggregate(data_merge, bootstrap)
+
+'''
+read_facematching:
+    Read the main CSV file (a path or a binary file object) with the columns used by FACEMATCHING_SPEC only.
+'''
+def read_facematching(csv_main_path, data_ref=None):
+    return FACEMATCHING_PLAN.readMain(csv_main_path, data_ref)
+
+'''
+save_facematching:
+    Save the output dataframes as <SUBJECTID>_<output>.csv (or with the given output backend) under out_dir.
+    `session_id` names the part of the session in the dataset backend (see output.get_session_ids).
+    Return a list of the saved paths.
+'''
+def save_facematching(results, subject_id, out_dir='.', backend='csv', session_id=None):
+    save_paths = []
+    for name in ['avg_rxntime_per_condition', 'avg_accuracy_per_condition']:
+        save_path = save_output(results[name], out_dir, subject_id+"_"+name, backend, True, 'facematching', name, subject_id, session_id)
+        print("[INFO] Output is saved at {}".format(save_path))
+        save_paths.append(save_path)
+    return save_paths
+
+'''
+run_facematching:
+    Read, analyze and save a single session (see analyze_facematching for `bootstrap`).
+'''
+def run_facematching(csv_main_path, csv_ref_path, out_dir='.', backend='csv', bootstrap=None):
+    print("[INFO] Processing {}...".format(csv_main_path))
+    subject_id, session_id = get_session_ids(csv_main_path)
+    with instrument_stage('facematching', 'load') as record:
+        data_ref  = load_facematching_ref(csv_ref_path)
+        data_main = read_facematching(csv_main_path, data_ref)
+        record['rows'] = len(data_main)
+    assert len(data_main) == len(data_ref), "Assertion Failure: Please make sure if the number of data in {} matches that of in {}".format(csv_ref_path, csv_main_path)
+    results = analyze_facematching(data_main, data_ref, bootstrap)
+    with instrument_stage('facematching', 'write'):
+        return save_facematching(results, subject_id, out_dir, backend, session_id)
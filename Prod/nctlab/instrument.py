@@ -0,0 +1,164 @@
+import os
+import json
+import time
+import cProfile
+import contextlib
+import tracemalloc
+import pandas as pd
+
+# Settings of the current process, or None if the instrumentation is disabled
+_instrumentation = None
+
+'''
+enable_instrumentation:
+    Record every analyzer stage of the current process as a line of JSON appended to log_path.
+    Each record has the task, the stage, the session, wall time, CPU time and the number of rows processed.
+    If `trace_memory` is set, the tracemalloc peak of each stage is recorded as well (which slows the analysis down),
+    and if `profile_dir` is set, a cProfile dump of each session is written as <profile_dir>/<session>.prof.
+    `run_id` tags the records, so that a batch run can be summarized separately from the previous runs in the same log.
+'''
+def enable_instrumentation(log_path, trace_memory=False, profile_dir=None, run_id=None):
+    global _instrumentation
+    disable_instrumentation()
+    if profile_dir is not None:
+        os.makedirs(profile_dir, exist_ok=True)
+    if trace_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    # Every record is written with a single append, so that worker processes can share the log
+    _instrumentation = {'fd'          : os.open(log_path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644),
+                        'trace_memory': trace_memory,
+                        'profile_dir' : profile_dir,
+                        'run_id'      : run_id,
+                        'session'     : None}
+
+'''
+disable_instrumentation:
+    Stop recording and close the log.
+'''
+def disable_instrumentation():
+    global _instrumentation
+    if _instrumentation is None:
+        return
+    os.close(_instrumentation['fd'])
+    if _instrumentation['trace_memory'] and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    _instrumentation = None
+
+'''
+is_instrumentation_enabled:
+    Return True if the stages of the current process are recorded.
+'''
+def is_instrumentation_enabled():
+    return _instrumentation is not None
+
+'''
+write_record:
+    Append a record to the log as a line of JSON.
+'''
+def write_record(record):
+    record = dict(record, run_id=_instrumentation['run_id'], pid=os.getpid(), timestamp=time.strftime('%Y-%m-%dT%H:%M:%S'))
+    os.write(_instrumentation['fd'], (json.dumps(record, default=str) + '\n').encode('UTF-8'))
+
+'''
+instrument_stage:
+    A context manager around a stage of an analyzer (e.g., load, join, parse, aggregate, write).
+    The yielded dictionary is the record of the stage, and the number of rows processed can be set as record['rows'].
+    It does nothing but yielding an empty dictionary when the instrumentation is disabled.
+    e.g.) with instrument_stage('nback', 'load') as record:
+              data_main = pd.read_csv(csv_main_path)
+              record['rows'] = len(data_main)
+'''
+@contextlib.contextmanager
+def instrument_stage(task, stage):
+    if _instrumentation is None:
+        yield {}
+        return
+    record = {'task': task, 'stage': stage, 'session': _instrumentation['session'], 'rows': None}
+    trace_memory = _instrumentation['trace_memory'] and tracemalloc.is_tracing()
+    if trace_memory:
+        tracemalloc.reset_peak()
+        memory_before = tracemalloc.get_traced_memory()[0]
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    try:
+        yield record
+    except BaseException as e:
+        record['error'] = type(e).__name__
+        raise
+    finally:
+        record['wall_seconds'] = time.perf_counter() - wall_start
+        record['cpu_seconds']  = time.process_time() - cpu_start
+        if trace_memory:
+            record['peak_memory_bytes'] = tracemalloc.get_traced_memory()[1] - memory_before
+        write_record(record)
+
+'''
+instrument_session:
+    A context manager around the analysis of a single session.
+    The stages inside are tagged with `session`, the whole session is recorded as the 'total' stage,
+    and a cProfile dump of the session is written if `profile_dir` is set.
+'''
+@contextlib.contextmanager
+def instrument_session(task, session):
+    if _instrumentation is None:
+        yield
+        return
+    _instrumentation['session'] = session
+    profiler = cProfile.Profile() if _instrumentation['profile_dir'] is not None else None
+    record = {'task': task, 'stage': 'total', 'session': session, 'rows': None}
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield
+    except BaseException as e:
+        record['error'] = type(e).__name__
+        raise
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(os.path.join(_instrumentation['profile_dir'], session + '.prof'))
+        record['wall_seconds'] = time.perf_counter() - wall_start
+        record['cpu_seconds']  = time.process_time() - cpu_start
+        write_record(record)
+        _instrumentation['session'] = None
+
+'''
+instrument_run:
+    A context manager around the analysis of a command line (e.g., Task1_N-Back/analyze_Nback.py -instrument_log=stages.jsonl).
+    If `options` (keyword arguments of enable_instrumentation, see cli.get_instrument_options) are given, the stages are
+    recorded while the analysis runs, as a session named after `session_path` (e.g., the main CSV file).
+'''
+@contextlib.contextmanager
+def instrument_run(task, session_path, options=None):
+    if options is None:
+        yield
+        return
+    enable_instrumentation(**options)
+    try:
+        with instrument_session(task, os.path.splitext(os.path.basename(session_path))[0]):
+            yield
+    finally:
+        disable_instrumentation()
+    print("[INFO] Stages are recorded in {}".format(options['log_path']))
+
+'''
+summarize_instrumentation:
+    Read the JSON-lines log of the instrumentation and return a dataframe of the percentiles of every metric
+    (wall time, CPU time, peak memory and rows) per task and stage. Only the records of `run_id` are summarized if it is given.
+'''
+def summarize_instrumentation(log_path, run_id=None, percentiles=[50, 90, 99]):
+    records = pd.read_json(log_path, lines=True, dtype=False)
+    if run_id is not None:
+        records = records[records['run_id'] == run_id]
+    if 'error' in records.columns:
+        records = records[records['error'].isna()]
+    keys = [records['task'], records['stage']]
+    summary = records.groupby(keys, sort=False).size().to_frame('count')
+    for metric in ['wall_seconds', 'cpu_seconds', 'peak_memory_bytes', 'rows']:
+        if metric not in records.columns or records[metric].isna().all():
+            continue
+        df_groupby = pd.to_numeric(records[metric], errors='coerce').groupby(keys, sort=False)
+        for percentile in percentiles:
+            summary['{}_p{}'.format(metric, percentile)] = df_groupby.quantile(percentile/100)
+        summary[metric+'_max'] = df_groupby.max()
+    return summary.reset_index()
@@ -0,0 +1,58 @@
+import io
+import csv
+import importlib.util
+import pandas as pd
+
+# The pyarrow CSV engine of pandas (>=1.4) is used only if it is requested and pyarrow is installed
+PYARROW_AVAILABLE = importlib.util.find_spec('pyarrow') is not None
+
+# Values of a missing cell in PsychoPy exports, in addition to the defaults of pandas (e.g., an empty cell)
+PSYCHOPY_NA_VALUES = ['None']
+
+'''
+sniff_header:
+    Read the first few KB of a CSV file (a path or a binary file object, which is rewound afterwards) only.
+    Return the delimiter (comma or tab, whichever appears more often in the header line) and the column names.
+'''
+def sniff_header(csv_path, sample_size=8192):
+    if hasattr(csv_path, 'read'):
+        position = csv_path.tell()
+        sample = csv_path.read(sample_size)
+        csv_path.seek(position)
+    else:
+        with open(csv_path, mode='rb') as f:
+            sample = f.read(sample_size)
+    sample = sample.decode('utf-8-sig', errors='replace')
+    header_line = sample.splitlines()[0] if len(sample) > 0 else ''
+    delimiter = '\t' if header_line.count('\t') > header_line.count(',') else ','
+    columns = next(csv.reader(io.StringIO(header_line), delimiter=delimiter), [])
+    return delimiter, columns
+
+'''
+read_table:
+    Read a comma- or tab-separated PsychoPy export in a single pass.
+    The delimiter is sniffed from the header, and only the columns in `usecols` are parsed with the types in `dtype`
+    (columns missing from the file are ignored). PsychoPy writes 'None' for a missing response, which is read as NaN
+    so that the numeric columns keep their types. A numeric column with any other non-numeric cell (e.g., a response key
+    'space') is kept as strings instead, to be normalized by the task (see taskspec.to_number and taskspec.to_choice).
+    `csv_path` is either a path or a binary file object (e.g., io.BytesIO of a prefetched file).
+    Set `use_pyarrow` to use the pyarrow CSV engine when it is installed.
+    Note that pyarrow rounds every float correctly, which may differ from the default parser in the last digit.
+'''
+def read_table(csv_path, usecols=None, dtype=None, use_pyarrow=False, **kwargs):
+    delimiter, columns = sniff_header(csv_path)
+    if usecols is not None:
+        usecols = [column for column in columns if column in usecols]
+    numeric_dtype = {}
+    if dtype is not None:
+        dtype = {column: column_type for column, column_type in dtype.items() if column in columns}
+        # The types of the numeric columns are inferred by the parser, and only applied to the columns parsed as numbers
+        numeric_dtype = {column: column_type for column, column_type in dtype.items() if pd.api.types.is_numeric_dtype(column_type)}
+        dtype = {column: column_type for column, column_type in dtype.items() if column not in numeric_dtype}
+    engine = 'pyarrow' if use_pyarrow and PYARROW_AVAILABLE else 'c'
+    kwargs.setdefault('na_values', PSYCHOPY_NA_VALUES)
+    data = pd.read_csv(csv_path, sep=delimiter, usecols=usecols, dtype=dtype, engine=engine, keep_default_na=True, **kwargs)
+    for column, column_type in numeric_dtype.items():
+        if column in data.columns and pd.api.types.is_numeric_dtype(data[column].dtype):
+            data[column] = data[column].astype(column_type)
+    return data
@@ -0,0 +1,188 @@
+import os
+import json
+import hashlib
+import numpy as np
+import pandas as pd
+from .refcache import hash_file
+
+# Bump this whenever the parsing of a log file changes, so that stale caches are rebuilt.
+LOGCACHE_VERSION = 2
+
+'''
+get_log_cache_paths:
+    Return the paths of the binary columns and the JSON metadata of the cache of a log file.
+    A log file is keyed by the SHA-1 of its absolute path, and its content hash is checked on load.
+    e.g.) ./data/AA06LC00_BELT_TEST_2021_Jun_09_1320.log -> <cache_dir>/belt_<sha1 of the path>.bin / .json
+'''
+def get_log_cache_paths(log_path, name, cache_dir):
+    key = "{}_{}".format(name, hashlib.sha1(os.path.abspath(log_path).encode('UTF-8')).hexdigest())
+    return os.path.join(cache_dir, key+'.bin'), os.path.join(cache_dir, key+'.json')
+
+'''
+load_log_cache:
+    Parse a log file with `parse` (e.g., BELT_Analyzer.parseLogTable) only once, and memory-map the parsed table afterwards.
+    The table must consist of numeric columns and categorical columns (stored as their codes).
+    The cache is invalidated when the mtime/size and the content hash of the log file change.
+    If `max_bytes` is given, the least recently used caches under cache_dir are evicted to keep its size below max_bytes.
+'''
+def load_log_cache(log_path, parse, name, cache_dir, max_bytes=None):
+    stat = os.stat(log_path)
+    signature = [stat.st_mtime_ns, stat.st_size]
+    bin_path, meta_path = get_log_cache_paths(log_path, name, cache_dir)
+
+    meta = None
+    if os.path.isfile(meta_path):
+        try:
+            with open(meta_path, mode='r', encoding='UTF-8') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            # Corrupted, or evicted by another process in the meantime
+            meta = None
+    if meta is not None and meta.get('version') != LOGCACHE_VERSION:
+        meta = None
+
+    file_hash = None
+    if meta is not None and meta['signature'] != signature:
+        # The file has been touched; reuse the cache only if the content is unchanged
+        file_hash = hash_file(log_path)
+        if meta['hash'] != file_hash:
+            meta = None
+
+    if meta is not None:
+        try:
+            data_log = map_log_cache(bin_path, meta)
+        except (OSError, ValueError):
+            data_log = None
+        if data_log is not None:
+            if meta['signature'] != signature:
+                meta['signature'] = signature
+                save_log_cache_meta(meta, meta_path)
+            else:
+                # Mark as recently used
+                try:
+                    os.utime(meta_path)
+                except OSError:
+                    pass
+            return data_log
+
+    data_log = parse(log_path)
+    meta = {'version'  : LOGCACHE_VERSION,
+            'log_path' : os.path.abspath(log_path),
+            'signature': signature,
+            'hash'     : file_hash or hash_file(log_path)}
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        save_log_cache(data_log, meta, bin_path, meta_path)
+    except OSError as e:
+        print("[WARN] Unable to write the log cache {} ({}).".format(bin_path, e))
+        return data_log
+    if max_bytes is not None:
+        evict_log_cache(cache_dir, max_bytes, keep=[meta_path])
+    return data_log
+
+'''
+map_log_cache:
+    Memory-map the columns of a cached table described by its metadata.
+    The dataframe is built on the mapped columns without copying them, so that a cache hit does not read the file
+    into memory and the workers mapping the same cache share its pages (the columns are read-only).
+'''
+def map_log_cache(bin_path, meta):
+    num_rows = meta['num_rows']
+    columns = {}
+    for column in meta['columns']:
+        dtype = np.dtype(column['dtype'])
+        if num_rows > 0:
+            values = np.memmap(bin_path, dtype=dtype, mode='r', offset=column['offset'], shape=(num_rows,))
+        else:
+            values = np.empty(0, dtype=dtype)
+        if 'categories' in column:
+            values = pd.Categorical.from_codes(values, categories=column['categories'])
+        columns[column['name']] = values
+    return pd.DataFrame(columns, copy=False)
+
+'''
+save_log_cache:
+    Write the columns of a table back-to-back into bin_path (aligned to 8 bytes) and their layout into meta_path.
+    Both files are written atomically, and the metadata last, so that concurrent workers never map a partial file.
+'''
+def save_log_cache(data_log, meta, bin_path, meta_path):
+    meta = dict(meta, num_rows=len(data_log), columns=[])
+    tmp_path = "{}.{}.tmp".format(bin_path, os.getpid())
+    try:
+        with open(tmp_path, mode='wb') as f:
+            for name in data_log.columns:
+                column = {'name': name, 'offset': f.tell()}
+                if isinstance(data_log[name].dtype, pd.CategoricalDtype):
+                    # The codes keep the dtype chosen by pandas, so that Categorical.from_codes does not convert them on load
+                    values = data_log[name].array.codes
+                    column['categories'] = data_log[name].cat.categories.tolist()
+                else:
+                    values = np.ascontiguousarray(data_log[name].values)
+                column['dtype'] = values.dtype.str
+                f.write(values.tobytes())
+                f.write(b'\0' * (-f.tell() % 8))
+                meta['columns'].append(column)
+        os.replace(tmp_path, bin_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    save_log_cache_meta(meta, meta_path)
+
+'''
+save_log_cache_meta:
+    Write the metadata of a cache atomically.
+'''
+def save_log_cache_meta(meta, meta_path):
+    tmp_path = "{}.{}.tmp".format(meta_path, os.getpid())
+    with open(tmp_path, mode='w', encoding='UTF-8') as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, meta_path)
+
+'''
+evict_log_cache:
+    Remove the least recently used caches under cache_dir until their total size is at most max_bytes.
+    The caches of `keep` (paths of the metadata) are never removed.
+    Return a list of the log paths whose caches are removed.
+'''
+def evict_log_cache(cache_dir, max_bytes, keep=[]):
+    entries = []
+    for filename in os.listdir(cache_dir):
+        if not filename.endswith('.json'):
+            continue
+        meta_path = os.path.join(cache_dir, filename)
+        bin_path  = meta_path[:-len('.json')] + '.bin'
+        try:
+            stat = os.stat(meta_path)
+            size = stat.st_size + (os.path.getsize(bin_path) if os.path.exists(bin_path) else 0)
+        except OSError:
+            continue
+        entries.append((stat.st_mtime_ns, size, meta_path, bin_path))
+    total_bytes = sum(entry[1] for entry in entries)
+    removed = []
+    for _, size, meta_path, bin_path in sorted(entries):
+        if total_bytes <= max_bytes:
+            break
+        if meta_path in keep:
+            continue
+        try:
+            with open(meta_path, mode='r', encoding='UTF-8') as f:
+                removed.append(json.load(f).get('log_path'))
+        except (OSError, ValueError):
+            removed.append(None)
+        for path in [meta_path, bin_path]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        total_bytes -= size
+    return removed
+
+'''
+purge_log_cache:
+    Remove every cache under cache_dir.
+    Return a list of the log paths whose caches are removed.
+'''
+def purge_log_cache(cache_dir):
+    if not os.path.isdir(cache_dir):
+        return []
+    return evict_log_cache(cache_dir, 0)
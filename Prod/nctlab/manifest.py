@@ -0,0 +1,114 @@
+import os
+import sys
+import json
+import time
+import hashlib
+from .refcache import hash_file
+
+MANIFEST_FILENAME = 'nct_manifest.json'
+
+'''
+get_analyzer_version:
+    Get the module of a task (e.g., nctlab.nback).
+    Return its ANALYZER_VERSION (if any) followed by a hash of the source of the module and of every nctlab module it uses,
+    so that any change to the code of a task re-analyzes every session of the task.
+    e.g.) get_analyzer_version(nctlab.nback) -> 'Ver. 3 (10/25/2021) 5d41402abc4b'
+'''
+def get_analyzer_version(module):
+    package = module.__name__.rpartition('.')[0]
+    modules = {}
+    pending = [module]
+    while len(pending) > 0:
+        current = pending.pop()
+        if current.__name__ in modules:
+            continue
+        modules[current.__name__] = current
+        # Modules, functions and classes imported from the package
+        for value in vars(current).values():
+            name = getattr(value, '__name__', None) if type(value) is type(sys) else getattr(value, '__module__', None)
+            if isinstance(name, str) and name.startswith(package + '.') and name in sys.modules:
+                pending.append(sys.modules[name])
+    digest = hashlib.sha1()
+    for name in sorted(modules):
+        with open(modules[name].__file__, mode='rb') as f:
+            digest.update(name.encode('UTF-8') + b'\0' + f.read())
+    source_hash = digest.hexdigest()[:12]
+    version = getattr(module, 'ANALYZER_VERSION', None)
+    return source_hash if version is None else '{} {}'.format(version, source_hash)
+
+'''
+Class Manifest:
+    A JSON sidecar in the output directory that records, for every analyzed session, the content hash of its inputs
+    (main CSV, reference CSV or BELT .log), the analyzer version (see get_analyzer_version) and its outputs.
+    A session is up to date if none of them has changed since the last run, so a nightly run only re-analyzes new or
+    modified sessions.
+'''
+class Manifest:
+    def __init__(self, manifest_path):
+        self.manifest_path = manifest_path
+        self.sessions = {}
+        # Content hashes keyed by path, reused while (mtime, size) of the file is unchanged
+        self.file_hashes = {}
+        if os.path.isfile(manifest_path):
+            with open(manifest_path, mode='r', encoding='UTF-8') as f:
+                data = json.load(f)
+            self.sessions    = data.get('sessions', {})
+            self.file_hashes = data.get('file_hashes', {})
+
+    '''
+    hash_inputs:
+        Return a dictionary of the content hash of every input file.
+    '''
+    def hash_inputs(self, input_paths):
+        input_hashes = {}
+        for path in input_paths:
+            stat = os.stat(path)
+            signature = [stat.st_mtime_ns, stat.st_size]
+            cached = self.file_hashes.get(path)
+            if cached is None or cached['signature'] != signature:
+                cached = {'signature': signature, 'hash': hash_file(path)}
+                self.file_hashes[path] = cached
+            input_hashes[path] = cached['hash']
+        return input_hashes
+
+    '''
+    is_up_to_date:
+        Return True if the session was analyzed with the same inputs, analyzer version and config,
+        and all of its outputs still exist.
+    '''
+    def is_up_to_date(self, session_key, input_hashes, analyzer_version, config=None):
+        record = self.sessions.get(session_key)
+        if record is None:
+            return False
+        return (record['inputs'] == input_hashes and
+                record['analyzer_version'] == analyzer_version and
+                record.get('config') == config and
+                all(os.path.exists(path) for path in record['outputs']))
+
+    '''
+    record:
+        Record a successfully analyzed session.
+    '''
+    def record(self, session_key, input_hashes, analyzer_version, outputs, config=None):
+        self.sessions[session_key] = {'inputs'          : input_hashes,
+                                      'analyzer_version': analyzer_version,
+                                      'config'          : config,
+                                      'outputs'         : outputs,
+                                      'analyzed_at'     : time.strftime('%Y-%m-%dT%H:%M:%S')}
+
+    '''
+    save:
+        Write the manifest atomically.
+    '''
+    def save(self):
+        tmp_path = "{}.{}.tmp".format(self.manifest_path, os.getpid())
+        with open(tmp_path, mode='w', encoding='UTF-8') as f:
+            json.dump({'sessions': self.sessions, 'file_hashes': self.file_hashes}, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.manifest_path)
+
+'''
+is_modified_since:
+    Return True if any of the input files was modified at or after `since` (seconds since the epoch).
+'''
+def is_modified_since(input_paths, since):
+    return any(os.path.getmtime(path) >= since for path in input_paths)
@@ -0,0 +1,113 @@
+import os
+from .output import save_output, get_session_ids
+from .refcache import load_reference
+from .instrument import instrument_stage
+from .taskspec import compile_task_spec
+
+ANALYZER_VERSION = 'Ver. 3 (10/25/2021)'
+
+# Task spec of N-back (see taskspec)
+NBACK_SPEC = {'name'   : 'nback',
+              # Remove items having 'fix' trial_type in ref.csv, and map the main trials to the reference by floor(trial/2)
+              'ref'    : {'key': 'floor(trial/2)', 'filters': [('trial_type', '!=', 'fix')]},
+              # Drop items showing instr.jpg, incorrect answers, and items where rxn_time is NaN
+              # (meaning that the participant did not press the button, thus no rxn_time was recorded)
+              'filters': [('image_name', 'not_endswith', 'back_instr.jpg'),
+                          ('corr_resp_x', '==', 1),
+                          ('rxn_time', 'notna')],
+              # Goal 1: average response time per load size (0, 1, 2)
+              # Goal 2: average response time per stimulus
+              'outputs': {'avg_rxntime_per_loadsize': {'by': ['trial_type'], 'metrics': [('rxn_time', 'mean', 'rxn_time')]},
+                          'avg_rxntime_per_stimulus': {'metrics': [('Avg_rxntime_per_stimulus', 'mean', 'rxn_time')]}}}
+NBACK_PLAN = compile_task_spec(NBACK_SPEC)
+
+'''
+prepare_nback_ref:
+    Get the reference dataframe (e.g., nback_AB.csv).
+    Return the reference dataframe without 'fix' trials, indexed by the 'main_trial_id' column.
+    A reference dataframe that is already prepared is returned as it is.
+'''
+def prepare_nback_ref(data_ref):
+    return NBACK_PLAN.prepareReference(data_ref)
+
+'''
+load_nback_ref:
+    Read the reference CSV file (e.g., nback_AB.csv) as a prepared reference dataframe.
+    The reference is the same for every subject, so it is preprocessed once and cached (see refcache.load_reference).
+'''
+def load_nback_ref(csv_ref_path, cache_dir=None):
+    return load_reference(csv_ref_path, prepare_nback_ref, 'nback', cache_dir)
+
+'''
+merge_nback:
+    Get the main dataframe and the reference dataframe (see analyze_nback).
+    Return the joined dataframe of every trial (of the columns used by NBACK_SPEC only).
+'''
+def merge_nback(data_main, data_ref):
+    return NBACK_PLAN.join(data_main, data_ref)
+
+'''
+analyze_nback:
+    Get the main dataframe (e.g., PARTICIPANTID_Nback_YYYY_MMM_DD_XXXX.csv) and the reference dataframe (e.g., nback_AB.csv),
+    either as read from the CSV file or as prepared by prepare_nback_ref/load_nback_ref.
+    Return a dictionary of the output dataframes.
+    If `bootstrap` options are given (see bootstrap.py), every mean is followed by the bounds of its bootstrap interval.
+'''
+def analyze_nback(data_main, data_ref, bootstrap=None):
+    with instrument_stage('nback', 'join') as record:
+        data_merge = merge_nback(data_main, data_ref)
+        record['rows'] = len(data_merge)
+    with instrument_stage('nback', 'aggregate') as record:
+        results = aggregate_nback(data_merge, bootstrap)
+        record['rows'] = len(data_merge)
+    return results
+
+'''
+aggregate_nback:
+    Get the joined dataframe (see merge_nback).
+    Return a dictionary of the output dataframes (see analyze_nback for `bootstrap`).
+'''
+def aggregate_nback(data_merge, bootstrap=None):
+    return NBACK_PLAN.aggregate(data_merge, bootstrap)
+
+'''
+read_nback:
+    Read the main CSV file (a path or a binary file object) with the columns used by NBACK_SPEC only.
+'''
+def read_nback(csv_main_path, data_ref=None):
+    return NBACK_PLAN.readMain(csv_main_path, data_ref)
+
+'''
+save_nback:
+    Save the output dataframes as <SUBJECTID>_<output>.csv (or with the given output backend) under out_dir.
+    `session_id` names the part of the session in the dataset backend (see output.get_session_ids).
+    Return a list of the saved paths.
+'''
+def save_nback(results, subject_id, out_dir='.', backend='csv', session_id=None):
+    save_paths = []
+    for name, index in [('avg_rxntime_per_loadsize', True), ('avg_rxntime_per_stimulus', False)]:
+        save_path = save_output(results[name], out_dir, subject_id+"_"+name, backend, index, 'nback', name, subject_id, session_id)
+        print("[INFO] Output is saved at {}".format(save_path))
+        save_paths.append(save_path)
+    return save_paths
+
+'''
+run_nback:
+    Read, analyze and save a single session (see analyze_nback for `bootstrap`).
+'''
+def run_nback(csv_main_path, csv_ref_path, out_dir='.', backend='csv', bootstrap=None):
+    print("[INFO] Processing {}...".format(csv_main_path))
+    subject_id, session_id = get_session_ids(csv_main_path)
+
+    # Read csv files and store them as dataframe
+    with instrument_stage('nback', 'load') as record:
+        data_ref  = load_nback_ref(csv_ref_path)
+        data_main = read_nback(csv_main_path, data_ref)
+        record['rows'] = len(data_main)
+
+    # Sanity check
+    #assert 2*len(data_main) == len(data_ref)
+
+    results = analyze_nback(data_main, data_ref, bootstrap)
+    with instrument_stage('nback', 'write'):
+        return save_nback(results, subject_id, out_dir, backend, session_id)
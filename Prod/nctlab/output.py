@@ -0,0 +1,119 @@
+import os
+import pandas as pd
+from .cli import OUTPUT_BACKENDS
+
+'''
+Output backends:
+    - csv     : <out_dir>/<filename>.csv (default)
+    - parquet : <out_dir>/<filename>.parquet
+    - feather : <out_dir>/<filename>.feather
+    - dataset : a single partitioned Parquet dataset per cohort, i.e., every session's output is appended to
+                <out_dir>/<output>/task=<task>/subject_id=<subject_id>/part-<session_id>.parquet
+                (see get_session_ids) with a session_id column, so that the sessions of the same subject are kept side by side
+    parquet, feather and dataset require pyarrow.
+    The list is defined in cli.py, which the command lines import without pandas.
+'''
+
+'''
+to_columnar:
+    Convert a dataframe into a typed table for the columnar backends.
+    The index is kept as a column if `index` is set, object columns holding numbers become numeric,
+    list columns (e.g., BELT timestamps) are kept as native lists, and the rest become strings.
+'''
+def to_columnar(data, index=False):
+    data = data.reset_index() if index else data.copy()
+    data.columns = [str(column) for column in data.columns]
+    for column in data.columns:
+        values = data[column]
+        if values.dtype != object:
+            continue
+        is_valid = values.notna()
+        if values[is_valid].map(lambda v: isinstance(v, (list, tuple))).all() and is_valid.any():
+            data[column] = values.map(lambda v: list(v) if isinstance(v, (list, tuple)) else None)
+            continue
+        numeric = pd.to_numeric(values, errors='coerce')
+        if numeric.notna().sum() == is_valid.sum() and is_valid.any():
+            data[column] = numeric
+        else:
+            data[column] = values.where(~is_valid, values.astype(str))
+    return data
+
+'''
+get_session_ids:
+    Return (subject id, session id) of a session from the filename of its CSV file, the same way for every task.
+    e.g.) AA06LC00_BELT_TEST_2021_Jun_09_1320.csv -> ('AA06LC00', 'AA06LC00_BELT_TEST_2021_Jun_09_1320')
+'''
+def get_session_ids(csv_path):
+    session_id = os.path.splitext(os.path.basename(csv_path))[0]
+    return session_id.split('_')[0], session_id
+
+'''
+save_output:
+    Save an output dataframe with the given backend.
+    `filename` (without extension) is used by the file backends, and `task`, `name`, `subject_id` and `session_id`
+    (default: subject_id) by the dataset backend.
+    Return the saved path.
+'''
+def save_output(data, out_dir, filename, backend='csv', index=False, task=None, name=None, subject_id=None, session_id=None):
+    if backend == 'csv':
+        save_path = os.path.join(out_dir, filename+'.csv')
+        data.to_csv(save_path, index=index)
+    elif backend == 'parquet':
+        save_path = os.path.join(out_dir, filename+'.parquet')
+        to_columnar(data, index).to_parquet(save_path, index=False)
+    elif backend == 'feather':
+        save_path = os.path.join(out_dir, filename+'.feather')
+        to_columnar(data, index).to_feather(save_path)
+    elif backend == 'dataset':
+        partition_dir = os.path.join(out_dir, name, 'task={}'.format(task), 'subject_id={}'.format(subject_id))
+        os.makedirs(partition_dir, exist_ok=True)
+        part_filename = 'part-{}.parquet'.format(session_id if session_id is not None else subject_id)
+        save_path = os.path.join(partition_dir, part_filename)
+        # Write into a temporary file first (hidden from readers by the leading dot), so that a reader never sees a partial part
+        tmp_path  = os.path.join(partition_dir, '.{}.{}.tmp'.format(part_filename, os.getpid()))
+        # The session is kept as a column, since the sessions of a subject share the partition
+        to_columnar(data, index).assign(session_id=session_id if session_id is not None else subject_id).to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, save_path)
+    else:
+        raise ValueError("Unknown output backend: {} (choose from {})".format(backend, ', '.join(OUTPUT_BACKENDS)))
+    return save_path
+
+'''
+read_results:
+    Read an output of every subject from a dataset written by the dataset backend in one read.
+    e.g.) read_results('./results', 'aggregated_stats', task='belt')
+          -> aggregated stats of all BELT sessions with subject_id and session_id columns
+    Without `task`, the output of every task is read, and a ValueError is raised if the tasks do not share the same columns.
+'''
+def read_results(out_dir, name, task=None):
+    dataset_dir = os.path.join(out_dir, name)
+    if task is not None:
+        data = pd.read_parquet(os.path.join(dataset_dir, 'task={}'.format(task)))
+        data['task'] = task
+    else:
+        check_task_schemas(dataset_dir)
+        data = pd.read_parquet(dataset_dir)
+    for column in ['task', 'subject_id']:
+        # Partition columns are read as categoricals
+        data[column] = data[column].astype(str)
+    return data
+
+'''
+check_task_schemas:
+    Raise a ValueError if the task partitions of a dataset have different columns,
+    since reading them together would silently mix their rows under a union of the columns.
+'''
+def check_task_schemas(dataset_dir):
+    import pyarrow.parquet as pq
+    schemas = {}
+    for task_dir in sorted(os.listdir(dataset_dir)):
+        if not task_dir.startswith('task='):
+            continue
+        for root, _, filenames in os.walk(os.path.join(dataset_dir, task_dir)):
+            filenames = sorted(f for f in filenames if f.endswith('.parquet'))
+            if len(filenames) > 0:
+                schemas[task_dir[len('task='):]] = pq.read_schema(os.path.join(root, filenames[0])).names
+                break
+    if len(set(tuple(names) for names in schemas.values())) > 1:
+        raise ValueError("The tasks of {} have different columns ({}), so pass the task to read".format(
+            dataset_dir, ', '.join(sorted(schemas.keys()))))
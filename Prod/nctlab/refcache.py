@@ -0,0 +1,187 @@
+import os
+import json
+import hashlib
+import numpy as np
+import pandas as pd
+
+# Bump this whenever the preprocessing of a reference table changes, so that stale sidecars are rebuilt.
+REFCACHE_VERSION = 2
+
+# Preprocessed reference tables of the current process, keyed by (path, name)
+_memory_cache = {}
+
+'''
+hash_file:
+    Return the SHA-1 hex digest of the content of a file.
+'''
+def hash_file(path, blocksize=1<<20):
+    sha1 = hashlib.sha1()
+    with open(path, mode='rb') as f:
+        for block in iter(lambda: f.read(blocksize), b''):
+            sha1.update(block)
+    return sha1.hexdigest()
+
+'''
+get_default_cache_dir:
+    Return the per-user directory of the sidecars, i.e., $XDG_CACHE_HOME/nctlab/refcache (default: ~/.cache/nctlab/refcache).
+    Sidecars are not written next to the shared reference CSV files, so that nobody else can plant one.
+'''
+def get_default_cache_dir():
+    cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(cache_home, 'nctlab', 'refcache')
+
+'''
+get_sidecar_path:
+    Return the path of the binary sidecar of a reference CSV file, named after the file and the SHA-1 of its absolute path.
+    e.g.) ./data/nback_AB.csv -> ~/.cache/nctlab/refcache/nback_AB.csv.nback.<sha1 of the path>.refcache.npz
+'''
+def get_sidecar_path(csv_ref_path, name, cache_dir=None):
+    cache_dir = cache_dir if cache_dir is not None else get_default_cache_dir()
+    path_hash = hashlib.sha1(os.path.abspath(csv_ref_path).encode('UTF-8')).hexdigest()[:16]
+    return os.path.join(cache_dir, "{}.{}.{}.refcache.npz".format(os.path.basename(csv_ref_path), name, path_hash))
+
+'''
+load_reference:
+    Read a reference CSV file and preprocess it with `prepare` (e.g., nback.prepare_nback_ref) only once.
+    The preprocessed table is kept in memory for the lifetime of the process and persisted to a binary sidecar
+    under `cache_dir` (default: see get_default_cache_dir), which is invalidated when the mtime/size and the content hash
+    of the CSV file change.
+'''
+def load_reference(csv_ref_path, prepare, name, cache_dir=None, use_sidecar=True):
+    csv_ref_path = os.path.abspath(csv_ref_path)
+    stat = os.stat(csv_ref_path)
+    signature = [stat.st_mtime_ns, stat.st_size]
+
+    cached = _memory_cache.get((csv_ref_path, name))
+    if cached is not None and cached['signature'] == signature:
+        return cached['data']
+
+    sidecar_path = get_sidecar_path(csv_ref_path, name, cache_dir)
+    sidecar = None
+    if use_sidecar and os.path.isfile(sidecar_path):
+        try:
+            sidecar = load_sidecar(sidecar_path)
+        except Exception:
+            # Corrupted or written by an incompatible version
+            sidecar = None
+    # The types of the columns depend on the version of pandas (e.g., strings are object or str)
+    if sidecar is not None and (sidecar.get('version') != REFCACHE_VERSION or sidecar.get('pandas') != pd.__version__):
+        sidecar = None
+
+    file_hash = None
+    if sidecar is not None and sidecar['signature'] != signature:
+        # The file has been touched; reuse the sidecar only if the content is unchanged
+        file_hash = hash_file(csv_ref_path)
+        if sidecar['hash'] != file_hash:
+            sidecar = None
+
+    if sidecar is None:
+        file_hash = file_hash or hash_file(csv_ref_path)
+        sidecar = {'version'  : REFCACHE_VERSION,
+                   'pandas'   : pd.__version__,
+                   'signature': signature,
+                   'hash'     : file_hash,
+                   'data'     : prepare(pd.read_csv(csv_ref_path))}
+        if use_sidecar:
+            save_sidecar(sidecar, sidecar_path)
+    elif sidecar['signature'] != signature:
+        sidecar['signature'] = signature
+        save_sidecar(sidecar, sidecar_path)
+
+    _memory_cache[(csv_ref_path, name)] = {'signature': signature, 'data': sidecar['data']}
+    return sidecar['data']
+
+'''
+encode_table:
+    Return a dictionary of plain arrays of a dataframe and its index, which np.savez stores without pickle,
+    and the names and types of the columns. Object columns (strings and missing values, as read by pd.read_csv)
+    are stored as unicode arrays with a mask of the missing values.
+    Return None if a column holds anything else (e.g., Python objects), which is then not cached.
+'''
+def encode_table(data):
+    arrays  = {}
+    columns = []
+    for i, (column, values) in enumerate([(data.index.name, data.index.to_series())] + list(data.items())):
+        key = "column{}".format(i)
+        array = values.to_numpy()
+        if array.dtype == object:
+            is_missing = pd.isna(array)
+            if not all(isinstance(value, str) for value in array[~is_missing]):
+                return None
+            arrays[key+'_missing'] = is_missing
+            array = np.where(is_missing, '', array).astype(str)
+        arrays[key] = array
+        columns.append({'name': column, 'dtype': str(values.dtype)})
+    return arrays, columns
+
+'''
+decode_table:
+    Return the dataframe of the arrays and the columns of encode_table.
+'''
+def decode_table(arrays, columns):
+    data = {}
+    for i, column in enumerate(columns):
+        key = "column{}".format(i)
+        values = arrays[key]
+        if key+'_missing' in arrays:
+            values = values.astype(object)
+            values[arrays[key+'_missing']] = np.nan
+        data[i] = pd.Series(values).astype(column['dtype'])
+    index = pd.Index(data.pop(0), name=columns[0]['name'])
+    data_out = pd.DataFrame({i: values.values for i, values in data.items()}, index=index)
+    data_out.columns = [column['name'] for column in columns[1:]]
+    return data_out
+
+'''
+load_sidecar:
+    Read a sidecar written by save_sidecar. The arrays are read with allow_pickle=False, so a sidecar cannot run code.
+'''
+def load_sidecar(sidecar_path):
+    with np.load(sidecar_path, allow_pickle=False) as npz:
+        arrays = {key: npz[key] for key in npz.files}
+    meta = json.loads(str(arrays.pop('meta')))
+    return {'version'  : meta['version'],
+            'pandas'   : meta['pandas'],
+            'signature': meta['signature'],
+            'hash'     : meta['hash'],
+            'data'     : decode_table(arrays, meta['columns'])}
+
+'''
+save_sidecar:
+    Write the sidecar atomically so that concurrent workers never read a partial file.
+'''
+def save_sidecar(sidecar, sidecar_path):
+    encoded = encode_table(sidecar['data'])
+    if encoded is None:
+        return
+    arrays, columns = encoded
+    meta = {'version': sidecar['version'], 'pandas': sidecar['pandas'], 'signature': sidecar['signature'], 'hash': sidecar['hash'], 'columns': columns}
+    tmp_path = "{}.{}.tmp".format(sidecar_path, os.getpid())
+    try:
+        os.makedirs(os.path.dirname(sidecar_path), mode=0o700, exist_ok=True)
+        with open(tmp_path, mode='wb') as f:
+            np.savez(f, meta=np.array(json.dumps(meta)), **arrays)
+        os.replace(tmp_path, sidecar_path)
+    except OSError as e:
+        print("[WARN] Unable to write the reference cache {} ({}).".format(sidecar_path, e))
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+'''
+join_reference:
+    Join the main dataframe with a reference table indexed by 'main_trial_id'.
+    Same as pd.merge(data_main, data_ref, on="main_trial_id") (inner join, the order of data_main is kept),
+    but rows are looked up by position of the index instead of building a hash table for every subject.
+'''
+def join_reference(data_main, data_ref, on='main_trial_id'):
+    if not data_ref.index.is_unique:
+        return pd.merge(data_main, data_ref.reset_index(), on=on)
+    ref_pos = data_ref.index.get_indexer(data_main[on].values)
+    is_found = ref_pos >= 0
+    data_left  = data_main[is_found].reset_index(drop=True)
+    data_right = data_ref.iloc[ref_pos[is_found]].reset_index(drop=True)
+    # Same suffixes as pd.merge for the columns in both tables
+    overlap = [c for c in data_left.columns if c in data_right.columns]
+    data_left  = data_left.rename(columns={c: c+'_x' for c in overlap})
+    data_right = data_right.rename(columns={c: c+'_y' for c in overlap})
+    return pd.concat([data_left, data_right], axis=1)
@@ -0,0 +1,381 @@
+import os
+import re
+import json
+import itertools
+import importlib.util
+import numpy as np
+import pandas as pd
+from .loader import read_table
+from .refcache import join_reference
+from .output import save_output, get_session_ids
+from .bootstrap import bootstrap_ci
+
+# Specs can be written in YAML only if PyYAML is installed (JSON and Python dictionaries always work)
+YAML_AVAILABLE = importlib.util.find_spec('yaml') is not None
+
+# Join key of the main table and index of the reference table
+JOIN_KEY = 'main_trial_id'
+
+'''
+Task spec:
+    A dictionary (or a JSON/YAML file, see load_task_spec) that declares how a session of a table-based task is analyzed.
+    Every column below is a column of the main table, or of the joined table if the task has a reference table
+    (i.e., with the suffixes _x and _y of pd.merge for the columns in both tables).
+    Conditions are (column, op, value) with op one of CONDITION_OPS, e.g., ('corr_resp_x', '==', 1).
+    - name     : the name of the task (e.g., nback)
+    - main     : the main table, i.e., {'dtypes': {column: type}} to parse the columns with the given types (see loader.read_table)
+    - ref      : the reference table joined on the first column of the main table, i.e., {'key': <key expression>, 'filters': [conditions]},
+                 where the key expression is a column, '<column>-<k>', '<column>+<k>' or 'floor(<column>/<k>)' (see KEY_EXPRESSIONS)
+    - derive   : columns computed before filtering, {column: [op, arguments...]} with op one of DERIVE_OPS
+    - filters  : conditions that every analyzed trial satisfies (combined into a single mask)
+    - outputs  : {output: output spec}, where an output spec has
+        - by        : factor columns of the conditions (omitted for a single row over every trial)
+        - levels    : {factor: levels} of the conditions in the order of itertools.product (default: the conditions found)
+        - labels    : labels of the conditions (default: the factor levels, e.g., "facesAreFearful=0 & facesAreAttended=1")
+        - metrics   : [output column, aggregation, column] with aggregation one of AGGREGATIONS
+        - layout    : 'frame' (a dataframe indexed by the conditions, default) or 'text' (a column of the condition labels
+                      followed by the metrics, every cell as text)
+        - label     : the column of the condition labels of the text layout (default: Condition)
+        - extra_rows: rows appended to the text layout, {'label': label, 'filters': [conditions], 'metrics': [metrics]},
+                      where the missing metrics are `fill` (default: -)
+        - filename  : the filename of the output, formatted with {subject_id} and {session_id} (see save_task_outputs)
+        - index     : whether the index is saved (default: True for the frame layout with `by`)
+    With bootstrap options (see bootstrap.py), every mean metric is followed by the bounds of its bootstrap interval
+    for every condition (see CI_COLUMNS).
+'''
+
+'''
+Condition operators: a function of (column, value) that returns a boolean array.
+A string value is compared with the column as text.
+'''
+CONDITION_OPS = {'=='          : lambda column, value: (column.astype(str) if isinstance(value, str) else column) == value,
+                 '!='          : lambda column, value: (column.astype(str) if isinstance(value, str) else column) != value,
+                 'isin'        : lambda column, value: column.isin(value),
+                 'notna'       : lambda column, value: column.notna(),
+                 'endswith'    : lambda column, value: column.str.endswith(value),
+                 'not_endswith': lambda column, value: ~column.str.endswith(value)}
+
+'''
+to_number:
+    Return a column as float.
+    String columns (e.g., empty response) are parsed by extracting the leading number, and unparsable values become NaN.
+'''
+def to_number(column):
+    if column.dtype in (['float','int']):
+        return column.astype(float)
+    column = column.where(column.isna(), column.astype(str))
+    return column.str.extract('(^[0-9]*.[0-9]*)', expand=False).astype(float)
+
+'''
+to_choice:
+    Return a column of response keys as float, where keys other than `choices` (single digits) become NaN.
+    String columns are parsed by extracting the leading key.
+'''
+def to_choice(column, choices):
+    if column.dtype in (['float','int']):
+        return column.where(column.isin(choices)).astype(float)
+    column = column.where(column.isna(), column.astype(str))
+    return column.str.extract('(^[{}])'.format(''.join(str(choice) for choice in choices)), expand=False).astype(float)
+
+'''
+Derived column operators: [op, arguments...] of a derived column (see the task spec).
+    - ['number', column]              : see to_number
+    - ['choice', column, choices]     : see to_choice
+    - ['any', [[conditions], ...]]    : True if every condition of any of the lists holds
+'''
+DERIVE_OPS = {'number': lambda data, column: to_number(data[column]),
+              'choice': lambda data, column, choices: to_choice(data[column], choices),
+              'any'   : lambda data, groups: np.logical_or.reduce([get_mask(data, conditions) for conditions in groups])}
+
+'''
+Aggregations: (a function of a groupby column, a function of a column, the value of a condition without trials).
+    - mean       : the mean (of each condition computed by groupby)
+    - series_mean: the mean of each condition computed the same way as Series.mean (may differ from mean in the last digit)
+    - count_true : the number of true (nonzero) values as int
+    - count_false: the number of trials that are not counted by count_true (including missing values)
+'''
+AGGREGATIONS = {'mean'       : (lambda grouped: grouped.mean(),
+                                lambda column: column.mean(), np.nan),
+                'series_mean': (lambda grouped: grouped.agg(lambda column: column.dropna().mean()),
+                                lambda column: column.dropna().mean(), np.nan),
+                'count_true' : (lambda grouped: grouped.sum().astype(int),
+                                lambda column: int(column.sum()), 0),
+                'count_false': (lambda grouped: grouped.size() - grouped.sum().astype(int),
+                                lambda column: len(column) - int(column.sum()), 0)}
+
+# Aggregations of the metrics that get a bootstrap interval, and the columns of its bounds per layout
+BOOTSTRAP_AGGREGATIONS = ['mean', 'series_mean']
+CI_COLUMNS = {'frame': ('{}_ci_low', '{}_ci_high'),
+              'text' : ('{} CI Low', '{} CI High')}
+
+'''
+Key expressions: (pattern, function of the column and k) of the join key of a reference table.
+Keys computed with an expression are truncated to int.
+'''
+KEY_EXPRESSIONS = [(re.compile(r'^floor\((.+)/(\d+)\)$'), lambda column, k: np.floor(column/k)),
+                   (re.compile(r'^(.+)-(\d+)$'),          lambda column, k: column-k),
+                   (re.compile(r'^(.+)\+(\d+)$'),         lambda column, k: column+k)]
+
+'''
+get_mask:
+    Return a boolean array of the rows that satisfy every condition.
+'''
+def get_mask(data, conditions):
+    mask = np.ones(len(data), dtype=bool)
+    for column, op, *value in conditions:
+        mask &= np.asarray(CONDITION_OPS[op](data[column], value[0] if len(value) > 0 else None), dtype=bool)
+    return mask
+
+'''
+get_key:
+    Return the join key of every row of a table given a key expression (see KEY_EXPRESSIONS).
+'''
+def get_key(data, expression):
+    for pattern, function in KEY_EXPRESSIONS:
+        match = pattern.match(expression.replace(' ', ''))
+        if match is not None:
+            return function(data[match.group(1)], int(match.group(2))).values.astype(int)
+    return data[expression].values
+
+'''
+get_columns:
+    Return the columns used by a list of conditions.
+'''
+def get_columns(conditions):
+    return [condition[0] for condition in conditions]
+
+'''
+get_intervals:
+    Return {CI column: bounds} of a mean metric (see CI_COLUMNS), given the groups of its values (see bootstrap.bootstrap_ci).
+'''
+def get_intervals(groups, column, layout, bootstrap):
+    data_ci = bootstrap_ci(groups, **bootstrap)
+    return {ci_column.format(column): data_ci[bound] for ci_column, bound in zip(CI_COLUMNS[layout], ['ci_low', 'ci_high'])}
+
+'''
+load_task_spec:
+    Read a task spec from a JSON or YAML file (see the task spec).
+'''
+def load_task_spec(spec_path):
+    with open(spec_path, mode='r', encoding='UTF-8') as f:
+        if os.path.splitext(spec_path)[1].lower() in ('.yaml', '.yml'):
+            if not YAML_AVAILABLE:
+                raise ImportError("PyYAML is required to read {} (or write the spec in JSON)".format(spec_path))
+            import yaml
+            return yaml.safe_load(f)
+        return json.load(f)
+
+'''
+Class TaskPlan:
+    A task spec compiled into a single pass over the trials:
+    only the used columns are read and joined, the derived columns are computed once, the filters are combined
+    into one mask, and the outputs grouped by the same factors share a single groupby.
+'''
+class TaskPlan:
+    def __init__(self, spec):
+        self.spec    = spec
+        self.name    = spec['name']
+        self.main    = spec.get('main', {})
+        self.ref     = spec.get('ref')
+        self.derive  = spec.get('derive', {})
+        self.filters = spec.get('filters', [])
+        self.outputs = spec['outputs']
+        # Columns of the main (or joined) table used by the derived columns, the filters and the outputs
+        columns = []
+        for op, *arguments in self.derive.values():
+            columns += get_columns(itertools.chain(*arguments[0])) if op == 'any' else [arguments[0]]
+        columns += get_columns(self.filters)
+        for output in self.outputs.values():
+            columns += list(output.get('by', []))
+            columns += [metric[2] for metric in output['metrics']]
+            for extra_row in output.get('extra_rows', []):
+                columns += get_columns(extra_row.get('filters', [])) + [metric[2] for metric in extra_row.get('metrics', [])]
+        self.columns = [column for column in dict.fromkeys(columns) if column not in self.derive]
+
+    '''
+    readMain:
+        Read the main CSV file (a path or a binary file object) with the used columns only.
+        A table joined with a reference table (`data_ref`) keeps its first column (the join key) and the columns
+        in both tables as well, so that the suffixes of the joined columns are the same as the full table.
+    '''
+    def readMain(self, csv_path, data_ref=None):
+        if self.ref is None:
+            return read_table(csv_path, usecols=self.columns, dtype=self.main.get('dtypes'))
+        position = csv_path.tell() if hasattr(csv_path, 'read') else None
+        header = pd.read_csv(csv_path, nrows=0).columns
+        if position is not None:
+            csv_path.seek(position)
+        ref_columns = set(data_ref.columns) if data_ref is not None else set(header)
+        usecols = [i for i, column in enumerate(header)
+                   if i == 0 or column in ref_columns or column in self.columns]
+        return pd.read_csv(csv_path, usecols=usecols)
+
+    '''
+    prepareReference:
+        Return the reference table without the filtered rows, indexed by the join key.
+        A reference table that is already prepared is returned as it is.
+    '''
+    def prepareReference(self, data_ref):
+        if data_ref.index.name == JOIN_KEY:
+            return data_ref
+        if len(self.ref.get('filters', [])) > 0:
+            data_ref = data_ref[get_mask(data_ref, self.ref['filters'])].copy()
+        else:
+            data_ref = data_ref.copy()
+        data_ref[JOIN_KEY] = get_key(data_ref, self.ref['key'])
+        return data_ref.set_index(JOIN_KEY)
+
+    '''
+    join:
+        Join the main table with the reference table on the join key (the first column of the main table).
+        Return the joined table of the used columns only, named the same way as pd.merge of the full tables.
+    '''
+    def join(self, data_main, data_ref):
+        data_ref  = self.prepareReference(data_ref)
+        data_main = data_main.rename(columns={data_main.columns[0]: JOIN_KEY})
+        main_names = {column: column+'_x' if column in data_ref.columns else column for column in data_main.columns[1:]}
+        ref_names  = {column: column+'_y' if column in data_main.columns else column for column in data_ref.columns}
+        main_names = {column: name for column, name in main_names.items() if name in self.columns}
+        ref_names  = {column: name for column, name in ref_names.items() if name in self.columns}
+        if not data_ref.index.is_unique:
+            return join_reference(data_main[[JOIN_KEY] + list(main_names)].rename(columns=main_names),
+                                  data_ref[list(ref_names)].rename(columns=ref_names))
+        # Same as join_reference, but only the used columns are gathered
+        ref_pos  = data_ref.index.get_indexer(data_main[JOIN_KEY].values)
+        is_found = ref_pos >= 0
+        columns = {JOIN_KEY: data_main[JOIN_KEY].values[is_found]}
+        columns.update({name: data_main[column].values[is_found] for column, name in main_names.items()})
+        columns.update({name: data_ref[column].values[ref_pos[is_found]] for column, name in ref_names.items()})
+        return pd.DataFrame(columns)
+
+    '''
+    analyze:
+        Get the main table (and the reference table if the task has one).
+        Return a dictionary of the output dataframes (with the bootstrap intervals of the means if `bootstrap` options are given).
+    '''
+    def analyze(self, data_main, data_ref=None, bootstrap=None):
+        data = self.join(data_main, data_ref) if self.ref is not None else data_main
+        return self.aggregate(data, bootstrap)
+
+    '''
+    aggregate:
+        Get the main (or joined) table.
+        Return a dictionary of the output dataframes (with the bootstrap intervals of the means if `bootstrap` options are given).
+    '''
+    def aggregate(self, data, bootstrap=None):
+        data = data[[column for column in self.columns if column in data.columns]]
+        if len(self.derive) > 0:
+            data = data.copy()
+        for column, (op, *arguments) in self.derive.items():
+            data[column] = DERIVE_OPS[op](data, *arguments)
+        if len(self.filters) > 0:
+            data = data[get_mask(data, self.filters)]
+        groupbys = {}
+        results  = {}
+        for name, output in self.outputs.items():
+            by = tuple(output.get('by', []))
+            if len(by) > 0 and by not in groupbys:
+                # The conditions are reordered by their levels anyway, if given
+                groupbys[by] = data.groupby(list(by) if len(by) > 1 else by[0], sort='levels' not in output)
+            results[name] = self.getOutput(data, groupbys.get(by), output, bootstrap)
+        return results
+
+    '''
+    getOutput:
+        Compute the metrics of an output spec for every condition, and lay them out.
+        The bootstrap intervals of the mean metrics draw the resamples of each condition at once (see bootstrap.bootstrap_ci).
+    '''
+    def getOutput(self, data, df_groupby, output, bootstrap=None):
+        layout  = output.get('layout', 'frame')
+        metrics = {}
+        fill_values = {}
+        for column, aggregation, source in output['metrics']:
+            grouped_function, function, fill_values[column] = AGGREGATIONS[aggregation]
+            if df_groupby is None:
+                metrics[column] = pd.Series([function(data[source])])
+            else:
+                metrics[column] = grouped_function(df_groupby[source])
+            if bootstrap is not None and aggregation in BOOTSTRAP_AGGREGATIONS:
+                groups = [(0, data[source].values)] if df_groupby is None else ((key, values.values) for key, values in df_groupby[source])
+                for ci_column, bounds in get_intervals(groups, column, layout, bootstrap).items():
+                    metrics[ci_column] = bounds.reindex(metrics[column].index)
+                    fill_values[ci_column] = np.nan
+        conditions = None
+        if 'levels' in output:
+            factors = output['by']
+            conditions = pd.MultiIndex.from_product([output['levels'][factor] for factor in factors], names=factors)
+            if len(factors) == 1:
+                conditions = conditions.get_level_values(0)
+            for column, fill_value in fill_values.items():
+                metrics[column] = metrics[column].reindex(conditions) if fill_value is np.nan else metrics[column].reindex(conditions, fill_value=fill_value)
+
+        if layout == 'frame':
+            if df_groupby is None:
+                return pd.DataFrame.from_dict({column: list(values) for column, values in metrics.items()})
+            return pd.DataFrame(metrics)
+
+        # Text layout: the labels of the conditions followed by the metrics
+        index = conditions if conditions is not None else next(iter(metrics.values())).index
+        labels = output.get('labels')
+        if labels is None and 'levels' in output:
+            labels = [' & '.join('{}={}'.format(name, level) for name, level in zip(output['by'], np.atleast_1d(condition)))
+                      for condition in index]
+        elif labels is None:
+            labels = list(index)
+        rows = [list(labels)] + [list(values.values) for values in metrics.values()]
+        fill = output.get('fill', '-')
+        for extra_row in output.get('extra_rows', []):
+            data_row = data[get_mask(data, extra_row['filters'])] if len(extra_row.get('filters', [])) > 0 else data
+            values = {}
+            for column, aggregation, source in extra_row.get('metrics', []):
+                values[column] = AGGREGATIONS[aggregation][1](data_row[source])
+                if bootstrap is not None and aggregation in BOOTSTRAP_AGGREGATIONS:
+                    values.update({ci_column: bounds.iloc[0] for ci_column, bounds in get_intervals([(0, data_row[source].values)], column, layout, bootstrap).items()})
+            rows[0].append(extra_row['label'])
+            for row, column in zip(rows[1:], metrics.keys()):
+                row.append(values.get(column, fill))
+        data_out = np.array(rows).transpose()
+        return pd.DataFrame(data=data_out, columns=[output.get('label', 'Condition')] + list(metrics.keys()))
+
+'''
+compile_task_spec:
+    Compile a task spec (a dictionary, or a path to a JSON/YAML file) into a TaskPlan.
+'''
+def compile_task_spec(spec):
+    if isinstance(spec, str):
+        spec = load_task_spec(spec)
+    return TaskPlan(spec)
+
+'''
+save_task_outputs:
+    Save the output dataframes of a session under out_dir, named by the `filename` of each output spec
+    (default: <SUBJECTID>_<output>), formatted with the subject id and the session id (the CSV filename) of csv_path.
+    Return a list of the saved paths.
+'''
+def save_task_outputs(results, plan, csv_path, out_dir='.', backend='csv'):
+    subject_id, session_id = get_session_ids(csv_path)
+    save_paths = []
+    for name, output in plan.outputs.items():
+        filename = output.get('filename', '{subject_id}_'+name).format(subject_id=subject_id, session_id=session_id)
+        index = output.get('index', output.get('layout', 'frame') == 'frame' and len(output.get('by', [])) > 0)
+        save_path = save_output(results[name], out_dir, filename, backend, index, plan.name, name, subject_id, session_id)
+        print("[INFO] Output is saved at {}".format(save_path))
+        save_paths.append(save_path)
+    return save_paths
+
+'''
+run_task_spec:
+    Read, analyze and save a single session of the task declared by a task spec (a dictionary, a path, or a TaskPlan).
+    `csv_ref_path` is the reference CSV file of a task with a reference table.
+    `bootstrap` options (see bootstrap.py) add the bootstrap intervals of the means.
+'''
+def run_task_spec(spec, csv_path, csv_ref_path=None, out_dir='.', backend='csv', bootstrap=None):
+    plan = spec if isinstance(spec, TaskPlan) else compile_task_spec(spec)
+    print("[INFO] Processing {}...".format(csv_path))
+    data_ref = None
+    if plan.ref is not None:
+        if csv_ref_path is None:
+            raise ValueError("A reference CSV file is required for {}".format(plan.name))
+        data_ref = plan.prepareReference(pd.read_csv(csv_ref_path))
+    results = plan.analyze(plan.readMain(csv_path, data_ref), data_ref, bootstrap)
+    return save_task_outputs(results, plan, csv_path, out_dir, backend)
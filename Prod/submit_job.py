@@ -0,0 +1,92 @@
+import os
+import sys
+import json
+import socket
+import argparse
+import http.client
+
+# Only the standard library is imported, so that submitting a job does not pay for importing pandas
+
+'''
+Class UnixHTTPConnection:
+    Same as HTTPConnection, but connect to a Unix socket (see analyze_service.py -socket).
+'''
+class UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, socket_path, timeout=None):
+        super().__init__('localhost', timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+'''
+requestService:
+    Send a request to the analysis service (see analyze_service.py) and return (HTTP status, JSON response).
+'''
+def requestService(method, path, data=None, host='127.0.0.1', port=8765, socket_path=None, timeout=None):
+    connection = UnixHTTPConnection(socket_path, timeout) if socket_path is not None else http.client.HTTPConnection(host, port, timeout=timeout)
+    try:
+        body = json.dumps(data).encode('UTF-8') if data is not None else None
+        connection.request(method, path, body=body, headers={'Content-Type': 'application/json'})
+        response = connection.getresponse()
+        return response.status, json.loads(response.read())
+    finally:
+        connection.close()
+
+
+def main():
+    '''
+    Parse Arguments
+    '''
+    parser = argparse.ArgumentParser(description='Submit a session to the running analysis service (see analyze_service.py)')
+    parser.add_argument('-csv_path', type=str, default=None,
+                       help='a path to the CSV file of the session (the task is detected from the filename)')
+    parser.add_argument('-log_path', type=str, default=None,
+                       help='a path to the log file of BELT (default: the .log file of the same name as the CSV file)')
+    parser.add_argument('-task', type=str, default=None, choices=['nback', 'facematching', 'belt', 'banda', 'banda_facematching'],
+                       help='the task of the session (default: detected from the filename)')
+    parser.add_argument('-ref_path', type=str, default=None,
+                       help='a path to the reference CSV file (default: the one preloaded by the service)')
+    parser.add_argument('-out_dir', type=str, default=None,
+                       help='a path to an existing directory under the -out_root of the service where the outputs are saved (default: -out_root of the service)')
+    parser.add_argument('-output_backend', type=str, default=None,
+                       help='csv, parquet, feather, or dataset (default: the backend of the service)')
+    parser.add_argument('-stats', action='store_true',
+                       help='print the counters of the service instead of submitting a session')
+    parser.add_argument('-host', type=str, default='127.0.0.1',
+                       help='the address of the service (default: 127.0.0.1)')
+    parser.add_argument('-port', type=int, default=8765,
+                       help='the port of the service (default: 8765)')
+    parser.add_argument('-socket', type=str, default=None,
+                       help='a path to the Unix socket of the service instead of -host and -port')
+    args = parser.parse_args()
+
+    if args.stats:
+        _, stats = requestService('GET', '/stats', host=args.host, port=args.port, socket_path=args.socket)
+        print(json.dumps(stats, indent=1))
+        return
+    if args.csv_path is None:
+        parser.error('-csv_path is required unless -stats is set')
+
+    # The service may run in another directory, so every path is sent as an absolute path
+    job = {'csv_path': os.path.abspath(os.path.expanduser(args.csv_path))}
+    for key, value in [('log_path', args.log_path), ('ref_path', args.ref_path), ('out_dir', args.out_dir)]:
+        if value is not None:
+            job[key] = os.path.abspath(os.path.expanduser(value))
+    for key, value in [('task', args.task), ('output_backend', args.output_backend)]:
+        if value is not None:
+            job[key] = value
+
+    status, result = requestService('POST', '/jobs', job, host=args.host, port=args.port, socket_path=args.socket)
+    if result.get('status') != 'ok':
+        print("[ERROR] Failed to process {} (HTTP {}):\n{}".format(args.csv_path, status, result.get('error')))
+        sys.exit(1)
+    for save_path in result['outputs']:
+        print("[INFO] Output is saved at {}".format(save_path))
+    print("[INFO] Completed in {:.3f}s.".format(result['seconds']))
+
+
+if __name__ == '__main__':
+    main()
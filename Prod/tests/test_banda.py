@@ -0,0 +1,33 @@
+import os
+import sys
+import numpy as np
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from nctlab.banda import read_banda, analyze_banda, normalize_banda_keys, normalize_banda_rt
+
+CONFLICT_CSV = '''facesAreFearful,facesAreAttended,attendedItemsMatch,SameDiffResponse.keys,SameDiffResponse.rt
+1,1,1,1,0.5
+1,1,0,space,0.7
+1,1,0,2,0.9x
+0,0,1,None,None
+0,0,0,2,0.4
+'''
+
+'''
+test_read_banda_with_string_keys:
+    A response key that is not a number (e.g., 'space') and a response time with a trailing character are kept as strings
+    by read_banda, and normalized to NaN and the leading number as the original analysis did.
+'''
+def test_read_banda_with_string_keys(tmp_path):
+    csv_path = str(tmp_path / 'BANDA001_Scanner_ABCD_conflict_2017_Jan_22_1501.csv')
+    with open(csv_path, mode='w') as f:
+        f.write(CONFLICT_CSV)
+    conflict_data = read_banda(csv_path)
+    assert conflict_data['facesAreFearful'].dtype == np.float64
+    np.testing.assert_array_equal(normalize_banda_keys(conflict_data['SameDiffResponse.keys']).values, [1, np.nan, 2, np.nan, 2])
+    np.testing.assert_array_equal(normalize_banda_rt(conflict_data['SameDiffResponse.rt']).values, [0.5, 0.7, 0.9, np.nan, 0.4])
+
+    # The conditions are labeled in the order of the levels (see BANDA_CONDITION_LABELS)
+    assert analyze_banda(conflict_data).values.tolist() == [['Fearful & Attended', '0.4', '1', '1'],
+                                                           ['Fearful & NOT Attended', 'nan', '0', '0'],
+                                                           ['NOT Fearful & Attended', 'nan', '0', '0'],
+                                                           ['NOT Fearful & NOT Attended', '0.7000000000000001', '2', '1']]
@@ -0,0 +1,18 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from nctlab.belt import get_post_event_window
+
+'''
+test_get_post_event_window:
+    The example of get_post_event_window, where an event without a condition stays in its own window.
+'''
+def test_get_post_event_window():
+    data_main = pd.DataFrame({'imgroot': ['blue', 'blue', 'blue', 'blue', 'pink', 'pink', np.nan, np.nan]})
+    is_event = [True, False, False, True, False, True, True, False]
+    for window, trials in [(1, [0, 1, 3, 5, 6]), (2, [0, 1, 2, 3, 5, 6])]:
+        data_window = get_post_event_window(data_main, is_event, window=window, offset_column='offset')
+        assert data_window['local_index'].tolist() == trials
+    assert data_window['offset'].tolist() == [0, 1, 2, 0, 0, 0]
@@ -0,0 +1,23 @@
+import argparse
+import os
+import sys
+import pytest
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from nctlab.cli import add_task_arguments, check_belt_arguments
+
+def parse_belt_arguments(argv):
+    parser = argparse.ArgumentParser()
+    add_task_arguments(parser, 'belt')
+    args = parser.parse_args(argv)
+    check_belt_arguments(parser, args)
+    return args
+
+'''
+test_check_belt_arguments:
+    The log file of the same subject is accepted with or without an underscore in the filenames, and the one of another subject is refused.
+'''
+def test_check_belt_arguments():
+    assert parse_belt_arguments(['-csv_path', 'x.csv']).log_path == 'x.log'
+    assert parse_belt_arguments(['-csv_path', 'AA00LC00_BELT_TEST.csv', '-log_path', 'AA00LC00_BELT.log']).log_path == 'AA00LC00_BELT.log'
+    with pytest.raises(SystemExit):
+        parse_belt_arguments(['-csv_path', 'AA00LC00_BELT_TEST.csv', '-log_path', 'BB00LC00_BELT.log'])
@@ -0,0 +1,34 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from nctlab import logcache
+
+def parse_log(log_path):
+    return pd.DataFrame({'timestamp': np.arange(5, dtype=np.float64),
+                         'msg'      : pd.Categorical(['start', 'pump', 'pump', 'pop', 'start'])})
+
+'''
+test_load_log_cache_maps_columns:
+    A cache hit returns the parsed table, and its columns share the memory of the mapped file instead of copies of it.
+'''
+def test_load_log_cache_maps_columns(tmp_path, monkeypatch):
+    log_path = str(tmp_path / 'AA00LC00_BELT_TEST.log')
+    with open(log_path, mode='w') as f:
+        f.write('log')
+    cache_dir = str(tmp_path / 'cache')
+    data_log = logcache.load_log_cache(log_path, parse_log, 'belt', cache_dir)
+
+    memmap = np.memmap
+    mapped = []
+    def record_memmap(*args, **kwargs):
+        mapped.append(memmap(*args, **kwargs))
+        return mapped[-1]
+    monkeypatch.setattr(np, 'memmap', record_memmap)
+    data_cached = logcache.load_log_cache(log_path, parse_log, 'belt', cache_dir)
+
+    pd.testing.assert_frame_equal(data_cached, data_log)
+    assert len(mapped) == 2
+    assert np.shares_memory(data_cached['timestamp'].values, mapped[0])
+    assert np.shares_memory(data_cached['msg'].array.codes, mapped[1])